@@ -4,10 +4,15 @@ from gameLogic import (
     newBoard, inputValidate, castle, movePiece, isKingSafe,
     checkCheckmateOrStalemate, getAllTeamMoves, promotePawn, castleValidate
 )
-from bot import botMove, checkMove, scoreMoveForEnemy, evaluate_move_quality
-import logging, random, os, json
+from bot import (
+    botMove, checkMove, scoreMoveForEnemy, evaluate_move_quality,
+    SearchCaches, TT_DEFAULT_MB, EVAL_CACHE_ENTRIES, KING_CACHE_ENTRIES, new_transposition_table
+)
+from position import CASTLE_BOT_SHORT, CASTLE_PLAYER_SHORT, CASTLE_TUPLE, castling_rights
+import logging, random, os, json, uuid
 import dotenv
 import time
+from collections import OrderedDict
 from typing import Optional
 
 # --- Config / init ---
@@ -25,6 +30,10 @@ MAX_BOT_DEPTH = 5
 SKILL_EVAL_DEPTH = 2
 SKILL_EMA_ALPHA = 0.20
 SKILL_ERR_CLAMP = 5.0  # pawns-ish
+MAX_GAME_TABLES = 4  # games whose search tables stay in memory, most recently used first
+
+# Search tables live in the process, not the cookie session; games find theirs by session['game_id'].
+_game_tables: "OrderedDict[str, dict]" = OrderedDict()
 
 def adaptive_enabled() -> bool:
     return bool(config.get("adaptiveDifficulty", True))
@@ -42,6 +51,52 @@ def bot_time_limit_s() -> Optional[float]:
     except Exception:
         return None
 
+def tt_size_mb() -> float:
+    try:
+        return max(1.0, float(config.get("ttSizeMB", TT_DEFAULT_MB)))
+    except Exception:
+        return float(TT_DEFAULT_MB)
+
+def _cache_entries(key: str, default: int) -> int:
+    try:
+        return max(1, int(config.get(key, default)))
+    except Exception:
+        return default
+
+def search_threads() -> int:
+    try:
+        return max(1, int(config.get("threads", 1)))
+    except Exception:
+        return 1
+
+def search_options() -> dict:
+    """Search switches for botMove (config `nullMovePruning`, `lateMoveReductions`, `threads`)."""
+    return {
+        'null_move': bool(config.get("nullMovePruning", True)),
+        'lmr': bool(config.get("lateMoveReductions", True)),
+        'threads': search_threads(),
+    }
+
+def _game_search() -> dict:
+    """Search tables (`tt`, `caches`) for the current session's game, shared by all of its searches."""
+    gid = session.get('game_id')
+    if gid is None:
+        gid = session['game_id'] = uuid.uuid4().hex
+    tables = _game_tables.get(gid)
+    if tables is None:
+        tables = _game_tables[gid] = {
+            'tt': new_transposition_table(tt_size_mb(), search_threads()),
+            'caches': SearchCaches.sized(
+                _cache_entries("evalCacheEntries", EVAL_CACHE_ENTRIES),
+                _cache_entries("kingCacheEntries", KING_CACHE_ENTRIES),
+            ),
+        }
+        while len(_game_tables) > MAX_GAME_TABLES:
+            _game_tables.popitem(last=False)
+    else:
+        _game_tables.move_to_end(gid)
+    return tables
+
 def asset_version() -> str:
     """
     Cache-busting for Safari/others: version static assets by mtime.
@@ -95,6 +150,7 @@ def _update_skill_and_depth(board_before, board_after):
             session["botWhite"],
             session["gameStates"],
             depth=SKILL_EVAL_DEPTH,
+            **_game_search(),
         )
         if res is None:
             return
@@ -117,6 +173,17 @@ def _check_terminal_for(turn_side):
     """Return 'checkmate'/'stalemate'/'none' for the side-to-move."""
     return checkCheckmateOrStalemate(session['board'], turn_side, session['botWhite'], session['gameStates'])
 
+def _record_board(board):
+    """
+    Make `board` the current position: keep the last two states for en passant and
+    drop any castling right whose king or rook has left home at any point.
+    """
+    session['board'] = board
+    session['gameStates'].append(board)
+    session['gameStates'] = session['gameStates'][-2:]
+    rights = session.get('castling', CASTLE_TUPLE)
+    session['castling'] = rights & castling_rights(board, session['botWhite'])
+
 def _end_game(status, winner=None):
     session['game_over'] = True
     session['winner'] = winner
@@ -126,10 +193,13 @@ def _end_game(status, winner=None):
 @app.get('/')
 def index():
     logging.debug("Index called")
+    _game_tables.pop(session.get('game_id'), None)
     session.clear()
+    session['game_id'] = uuid.uuid4().hex
     session['botWhite'] = random.choice([True, False])
     session['board'] = newBoard(session['botWhite'])
     session['gameStates'] = [session['board']]
+    session['castling'] = castling_rights(session['board'], session['botWhite'])
     session['turn'] = 'bot' if session['botWhite'] else 'player'
     session['promote'] = False
     session['promotion_piece'] = None
@@ -156,11 +226,12 @@ def index():
             pruneRate=session['prune_rate'],
             time_limit_s=bot_time_limit_s(),
             debug=bool(config.get("debugMode", False)),
+            castling=session.get('castling'),
+            **_game_search(),
+            **search_options(),
         )
         if new_board and isKingSafe(new_board, 'bot'):
-            session['board'] = new_board
-            session['gameStates'].append(new_board)
-            session['gameStates'] = session['gameStates'][-2:]
+            _record_board(new_board)
             # Check if player is already mated/stalemated before handing turn
             status = _check_terminal_for('player')
             if status == 'checkmate':
@@ -226,7 +297,8 @@ def make_move():
         board_before = session['board']
         validity, piece, dest = inputValidate(move_input, session['board'], session['botWhite'], session['turn'], session['gameStates'])
         if validity == "castle":
-            if not castleValidate(session['botWhite'], session['turn'], session['board']):
+            right = CASTLE_BOT_SHORT if session['turn'] == 'bot' else CASTLE_PLAYER_SHORT
+            if not session.get('castling', CASTLE_TUPLE) & right or not castleValidate(session['botWhite'], session['turn'], session['board']):
                 response['status'] = 'invalid-castle'
             else:
                 board_after = castle(session['turn'], session['board'], session['botWhite'])
@@ -244,9 +316,7 @@ def make_move():
                     return jsonify(response)
                 if adaptive_enabled() and session['turn'] == 'player':
                     _update_skill_and_depth(board_before, board_after)
-                session['board'] = board_after
-                session['gameStates'].append(session['board'])
-                session['gameStates'] = session['gameStates'][-2:]
+                _record_board(board_after)
 
                 # After player's move, check terminal on bot side immediately
                 outcome = _check_terminal_for('bot')
@@ -278,9 +348,7 @@ def make_move():
                 return jsonify(response)
             if adaptive_enabled() and session['turn'] == 'player':
                 _update_skill_and_depth(board_before, board_after)
-            session['board'] = board_after
-            session['gameStates'].append(session['board'])
-            session['gameStates'] = session['gameStates'][-2:]
+            _record_board(board_after)
 
             # Promotion trigger
             if piece[0].lower() == 'p' and (dest // 8 in (0, 7)):
@@ -333,9 +401,7 @@ def promote():
     choice = request.json.get('piece', 'QUEEN').upper()
     piece = session['promotion_piece']
     dest = session['promotion_dest']
-    session['board'] = promotePawn(piece, dest, choice, session['board'], 'player')
-    session['gameStates'].append(session['board'])
-    session['gameStates'] = session['gameStates'][-2:]
+    _record_board(promotePawn(piece, dest, choice, session['board'], 'player'))
     session['promote'] = False
     session['promotion_piece'] = None
     session['promotion_dest'] = None
@@ -393,14 +459,15 @@ def bot_move():
             pruneRate=session['prune_rate'],
             time_limit_s=bot_time_limit_s(),
             debug=bool(config.get("debugMode", False)),
+            castling=session.get('castling'),
+            **_game_search(),
+            **search_options(),
         )
         dt = time.perf_counter() - t0
         logging.info(f"bot_move depth={depth} adaptive={adaptive_enabled()} took {dt:.3f}s")
 
         if new_board and isKingSafe(new_board, session['turn']):
-            session['board'] = new_board
-            session['gameStates'].append(new_board)
-            session['gameStates'] = session['gameStates'][-2:]
+            _record_board(new_board)
 
             # After bot's move, check terminal on player's side immediately
             status = _check_terminal_for('player')
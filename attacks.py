@@ -0,0 +1,49 @@
+# attacks.py
+"""
+Precomputed attack tables, built once at import.
+
+Squares are indexed as in gameLogic and position: 0 is the top-left square, 63 the
+bottom-right. Rays run nearest square first and stop at the board edge, so callers
+walk one until it meets a piece. Both gameLogic and position read these tables,
+which is why they live in a module of their own.
+"""
+from typing import Dict, Tuple
+
+_ROOK_STEPS = (1, -1, 8, -8)
+_BISHOP_STEPS = (7, -7, 9, -9)
+_KING_STEPS = (-1, 1, -8, 8, -9, -7, 9, 7)
+_KNIGHT_OFFSETS = (15, 17, -15, -17, 10, 6, -10, -6)
+
+def _delta(step: int) -> Tuple[int, int]:
+    """(row, column) change of a step or knight jump: -9 is up-left, 6 one row down and two left, ..."""
+    dc = (step + 2) % 8 - 2
+    return (step - dc) // 8, dc
+
+def _target(sq: int, dr: int, dc: int) -> int:
+    """Index `dr` rows and `dc` columns away from `sq`, or -1 off the board."""
+    r, c = sq // 8 + dr, sq % 8 + dc
+    return r * 8 + c if 0 <= r < 8 and 0 <= c < 8 else -1
+
+def _ray(sq: int, step: int) -> Tuple[int, ...]:
+    dr, dc = _delta(step)
+    ray = []
+    i = _target(sq, dr, dc)
+    while i >= 0:
+        ray.append(i)
+        i = _target(i, dr, dc)
+    return tuple(ray)
+
+def _jumps(sq: int, offsets: Tuple[int, ...]) -> Tuple[int, ...]:
+    return tuple(i for i in (_target(sq, *_delta(off)) for off in offsets) if i >= 0)
+
+# RAYS[step][sq]: squares walked from sq along step.
+RAYS: Dict[int, Tuple[Tuple[int, ...], ...]] = {
+    step: tuple(_ray(sq, step) for sq in range(64)) for step in _ROOK_STEPS + _BISHOP_STEPS
+}
+ROOK_RAYS = tuple(tuple(RAYS[d][sq] for d in _ROOK_STEPS) for sq in range(64))
+BISHOP_RAYS = tuple(tuple(RAYS[d][sq] for d in _BISHOP_STEPS) for sq in range(64))
+QUEEN_RAYS = tuple(ROOK_RAYS[sq] + BISHOP_RAYS[sq] for sq in range(64))
+KNIGHT_TARGETS = tuple(_jumps(sq, _KNIGHT_OFFSETS) for sq in range(64))
+KING_TARGETS = tuple(_jumps(sq, _KING_STEPS) for sq in range(64))
+# PAWN_ATTACKS[0] for bot pawns (moving up), [1] for player pawns (moving down).
+PAWN_ATTACKS = tuple(tuple(_jumps(sq, (7 * f, 9 * f)) for sq in range(64)) for f in (-1, 1))
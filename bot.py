@@ -1,12 +1,42 @@
 # bot.py
 from __future__ import annotations
 import math
-from dataclasses import dataclass
-from typing import Optional, List, Dict, Tuple
-import random
+import multiprocessing
+import os
+import struct
+import weakref
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Callable, Optional, List, Iterator, Tuple
 import time
 import logging
+import numpy as np
+from cache import BoundedCache
 from gameLogic import getAllTeamMoves, isKingSafe, checkCheckmateOrStalemate
+from position import (
+    BOT,
+    CASTLE,
+    CODE,
+    KING,
+    PAWN,
+    PLAYER,
+    Move,
+    Position,
+    apply,
+    gives_check,
+    is_legal,
+    is_pseudo_legal,
+    king_safe,
+    legal_moves,
+    KIND,
+    SEE_VALUE,
+    mvv_lva,
+    pack_move,
+    see,
+    unpack_move,
+)
 
 def getCurrentBoard(gameStates):
     return gameStates[-1]
@@ -69,40 +99,56 @@ _PST_Q = [
     0,  0,  0,  1,  1,  0,  0,  0,
 ]
 
-def _pst_score(piece: str, idx: int) -> int:
-    t = piece[0].upper()
-    tbl = _PST_P if t=='P' else _PST_N if t=='N' else _PST_B if t=='B' else _PST_R if t=='R' else _PST_Q if t=='Q' else None
-    if tbl is None:
-        return 0
-    # uppercase = bot uses tbl as-is; lowercase = player mirrored vertically
-    return tbl[idx] if piece.isupper() else -tbl[63 - idx]
+def _build_psq() -> List[List[int]]:
+    """
+    Material + piece-square value per piece code and square (bot-centric, tenths of a pawn).
+    Uppercase = bot uses the tables as-is; lowercase = player mirrored vertically.
+    Integers keep Position.psq_sum exact however many moves are made and unmade.
+    """
+    tables = {'P': _PST_P, 'N': _PST_N, 'B': _PST_B, 'R': _PST_R, 'Q': _PST_Q}
+    psq = [[0] * 64 for _ in range(16)]
+    for letter, base in _PVAL.items():
+        tbl = tables.get(letter)
+        bot_code, player_code = CODE[letter], CODE[letter.lower()]
+        for i in range(64):
+            psq[bot_code][i] = base * 10 + (tbl[i] if tbl else 0)
+            psq[player_code][i] = -(base * 10 + (tbl[63 - i] if tbl else 0))
+    return psq
 
-def _material_positional(board, botWhite, gameStates) -> float:
-    score = 0.0
-    for i, p in enumerate(board):
-        if not p:
-            continue
-        base = _PVAL.get(p[0].upper(), 0)
-        score += base if p[0].isupper() else -base
-        score += _pst_score(p, i) / 10.0
-    return score
+_PSQ = _build_psq()
 
-def _mobility(board, botWhite, gameStates) -> float:
-    bot_sets = getAllTeamMoves('bot', board, botWhite, gameStates)
-    bot_cnt = sum(1 for ms in bot_sets for m in ms if isKingSafe(m, 'bot'))
-    pl_sets = getAllTeamMoves('player', board, botWhite, gameStates)
-    pl_cnt = sum(1 for ms in pl_sets for m in ms if isKingSafe(m, 'player'))
+def _attach_eval(pos: Position) -> Position:
+    """Have `pos` keep the material + PST sum up to date through make/unmake."""
+    if pos.psq is not _PSQ:
+        pos.attach_psq(_PSQ)
+    return pos
+
+def _material_positional(pos: Position) -> float:
+    if pos.psq is not _PSQ:
+        _attach_eval(pos)
+    return pos.psq_sum / 10.0
+
+def _mobility(pos: Position) -> float:
+    bot_pos = pos.copy()
+    bot_pos.side = BOT
+    bot_cnt = sum(1 for _ in legal_moves(bot_pos))
+    pl_pos = pos.copy()
+    pl_pos.side = PLAYER
+    pl_cnt = sum(1 for _ in legal_moves(pl_pos))
     return 0.02 * (bot_cnt - pl_cnt)
 
-def scoreMove(board, botWhite, gameStates) -> float:
-    score = _material_positional(board, botWhite, gameStates)
+def _score_position(pos: Position) -> float:
+    score = _material_positional(pos)
     # light king-safety nudges
-    if not isKingSafe(board, 'player'): score += 0.5
-    if not isKingSafe(board, 'bot'):    score -= 0.5
+    if not king_safe(pos, PLAYER): score += 0.5
+    if not king_safe(pos, BOT):    score -= 0.5
     if MOBILITY_WEIGHT:
-        score += MOBILITY_WEIGHT * _mobility(board, botWhite, gameStates)
+        score += MOBILITY_WEIGHT * _mobility(pos)
     return score
 
+def scoreMove(board, botWhite, gameStates) -> float:
+    return _score_position(Position.from_board(board, "bot", botWhite, gameStates))
+
 def scoreMoveForEnemy(board, botWhite, gameStates) -> float:
     # Perspective of the human (player)
     return -scoreMove(board, botWhite, gameStates)
@@ -110,195 +156,389 @@ def scoreMoveForEnemy(board, botWhite, gameStates) -> float:
 def _opponent(turn: str) -> str:
     return "player" if turn == "bot" else "bot"
 
-_ScoreCache = Dict[tuple, float]
-_KingSafeCache = Dict[Tuple[tuple, str], bool]
-
-def _score_move_cached(board, botWhite, gameStates, score_cache: _ScoreCache) -> float:
-    v = score_cache.get(board)
-    if v is None:
-        v = scoreMove(board, botWhite, gameStates)
-        score_cache[board] = v
-    return v
+# Both caches key on Position.hash; king safety also folds in the side asked about.
+EVAL_CACHE_ENTRIES = 1 << 17
+KING_CACHE_ENTRIES = 1 << 16
 
-def _eval_for_side_to_move(board, turn: str, botWhite, gameStates, score_cache: _ScoreCache) -> float:
+@dataclass
+class SearchCaches:
     """
-    Negamax-compatible evaluation:
-    - positive means good for side-to-move.
+    Evaluation and king-safety memo tables. They key on Position.hash like the TT,
+    so one set can serve every search of a game; sizes are entry counts.
     """
-    s = _score_move_cached(board, botWhite, gameStates, score_cache)  # bot-centric
-    return s if turn == "bot" else -s
+    score: BoundedCache
+    king_safe: BoundedCache
 
-# --- Quiescence search (captures only) ---
-def _is_side_piece(piece: Optional[str], turn: str) -> bool:
-    if not piece:
-        return False
-    return piece[0].isupper() if turn == "bot" else piece[0].islower()
+    @classmethod
+    def sized(cls, eval_entries: int = EVAL_CACHE_ENTRIES, king_entries: int = KING_CACHE_ENTRIES) -> "SearchCaches":
+        return cls(BoundedCache(eval_entries), BoundedCache(king_entries))
 
-def _is_enemy_piece(piece: Optional[str], turn: str) -> bool:
-    if not piece:
-        return False
-    return piece[0].islower() if turn == "bot" else piece[0].isupper()
+def _score_move_cached(pos: Position, score_cache: BoundedCache) -> float:
+    key = pos.hash
+    v = score_cache.get(key)
+    if v is None:
+        v = _score_position(pos)
+        score_cache.put(key, v)
+    return v
 
-def _is_capture(prev, nxt, turn: str) -> bool:
+def _eval_for_side_to_move(pos: Position, score_cache: BoundedCache) -> float:
     """
-    Detect whether prev->nxt is a capturing move by side `turn`.
-
-    We infer the move from board diffs. This handles normal captures and en passant.
-    Castling (4-square diff) is treated as non-capture.
+    Negamax-compatible evaluation:
+    - positive means good for side-to-move.
     """
-    diffs = [i for i in range(64) if prev[i] != nxt[i]]
-    if len(diffs) < 2:
-        return False
-    if len(diffs) >= 4:
-        return False
-
-    # Typical move/capture/promotion: exactly 2 squares change (from, to).
-    if len(diffs) == 2:
-        d0, d1 = diffs
-        from_idx = None
-        to_idx = None
+    s = _score_move_cached(pos, score_cache)  # bot-centric
+    return s if pos.side == BOT else -s
 
-        if _is_side_piece(prev[d0], turn) and nxt[d0] is None and _is_side_piece(nxt[d1], turn):
-            from_idx, to_idx = d0, d1
-        elif _is_side_piece(prev[d1], turn) and nxt[d1] is None and _is_side_piece(nxt[d0], turn):
-            from_idx, to_idx = d1, d0
-        else:
-            # Fallback for promotions or odd encodings: infer by "side piece disappeared" / "side piece appeared".
-            gone = [i for i in diffs if _is_side_piece(prev[i], turn) and not _is_side_piece(nxt[i], turn)]
-            came = [i for i in diffs if _is_side_piece(nxt[i], turn) and not _is_side_piece(prev[i], turn)]
-            if len(gone) == 1 and len(came) == 1:
-                from_idx, to_idx = gone[0], came[0]
-            else:
-                return False
-
-        return _is_enemy_piece(prev[to_idx], turn)
-
-    # En passant: 3 squares change (from pawn removed, pawn appears diagonally, captured pawn removed).
-    d0, d1, d2 = diffs
-    from_candidates = [i for i in diffs if _is_side_piece(prev[i], turn) and nxt[i] is None]
-    to_candidates = [i for i in diffs if _is_side_piece(nxt[i], turn)]
-    cap_candidates = [i for i in diffs if _is_enemy_piece(prev[i], turn) and nxt[i] is None]
-    if len(from_candidates) != 1 or len(to_candidates) != 1 or len(cap_candidates) != 1:
-        return False
-
-    from_idx = from_candidates[0]
-    to_idx = to_candidates[0]
-    cap_idx = cap_candidates[0]
-    moved_piece = nxt[to_idx]
-    if not moved_piece or moved_piece[0].lower() != "p":
-        return False
-    # In en passant, destination square was empty in prev, captured pawn removed elsewhere.
-    if prev[to_idx] is not None:
-        return False
-    # Pawn must move diagonally by 7/9 squares.
-    if abs(to_idx - from_idx) not in (7, 9):
-        return False
-    return True
-
-def _king_safe_cached(board, turn: str, king_safe_cache: _KingSafeCache) -> bool:
-    key = (board, turn)
+def _king_safe_cached(pos: Position, side: int, king_safe_cache: BoundedCache) -> bool:
+    key = (pos.hash << 1) | side
     v = king_safe_cache.get(key)
     if v is None:
-        v = isKingSafe(board, turn)
-        king_safe_cache[key] = v
+        v = king_safe(pos, side)
+        king_safe_cache.put(key, v)
     return v
 
+def _has_non_pawn_material(pos: Position, side: int) -> bool:
+    """False for king-and-pawns endings, where passing can be the best move (zugzwang)."""
+    sq = pos.sq
+    return any(KIND[sq[i]] not in (PAWN, KING) for i in pos.pieces[side].values())
+
+# --- Quiescence search (captures; evasions when in check) ---
+# Delta pruning: a capture that can't lift the stand-pat score to within this many
+# pawns of alpha, even winning the victim outright, is not searched.
+DELTA_MARGIN = 2.0
+
 def quiesce(
-    board,
-    turn,
+    pos: Position,
     alpha,
     beta,
-    botWhite,
-    gameStates,
-    score_cache: _ScoreCache,
-    king_safe_cache: _KingSafeCache,
+    score_cache: BoundedCache,
+    king_safe_cache: BoundedCache,
     node_cap: int = 64,
     ply: int = 0,
     ctx: Optional[_SearchCtx] = None,
 ):
     if ctx is not None:
         ctx.tick(in_quiesce=True)
-    stand_pat = _eval_for_side_to_move(board, turn, botWhite, gameStates, score_cache)
+    if not _king_safe_cached(pos, pos.side, king_safe_cache):
+        return _quiesce_evasions(pos, alpha, beta, score_cache, king_safe_cache, node_cap, ply, ctx)
+    stand_pat = _eval_for_side_to_move(pos, score_cache)
     if stand_pat >= beta:
         return beta
     if alpha < stand_pat:
         alpha = stand_pat
 
-    moves = getAllTeamMoves(turn, board, botWhite, gameStates)
-    next_turn = _opponent(turn)
     visited = 0
-    any_legal = False
-
-    # consider only capturing moves
-    for ms in moves:
-        for m in ms:
-            if not _is_capture(board, m, turn):
-                # We don't explore quiet moves in quiescence, but we still need to know whether
-                # any legal move exists to distinguish stalemate/checkmate.
-                if not any_legal and _king_safe_cached(m, turn, king_safe_cache):
-                    any_legal = True
-                continue
-            if not _king_safe_cached(m, turn, king_safe_cache):
-                continue
-            any_legal = True
-            score = -quiesce(
-                m,
-                next_turn,
-                -beta,
-                -alpha,
-                botWhite,
-                gameStates,
-                score_cache,
-                king_safe_cache,
-                node_cap,
-                ply + 1,
-                ctx,
-            )
-            visited += 1
-            if score >= beta:
-                return beta
-            if score > alpha:
-                alpha = score
-            if visited >= node_cap:
-                return alpha
+    # Only captures and promotions, biggest victim first; skip exchanges that lose
+    # material and captures too small to matter. Stalemate is not detected here.
+    captures = list(legal_moves(pos, noisy=True))
+    captures.sort(key=mvv_lva, reverse=True)
+    for m in captures:
+        if not m.promo and stand_pat + SEE_VALUE[KIND[m.captured]] / 100.0 + DELTA_MARGIN <= alpha:
+            if ctx is not None:
+                ctx.delta_pruned += 1
+            continue
+        if not _good_capture(pos, m):
+            if ctx is not None:
+                ctx.see_pruned += 1
+            continue
+        pos.make_move(m)
+        score = -quiesce(pos, -beta, -alpha, score_cache, king_safe_cache, node_cap, ply + 1, ctx)
+        pos.unmake_move()
+        visited += 1
+        if score >= beta:
+            return beta
+        if score > alpha:
+            alpha = score
+        if visited >= node_cap:
+            return alpha
+    return alpha
 
-    # If there are no legal moves at all, it's mate or stalemate.
-    if not any_legal:
-        return (-MATE_SCORE + ply) if (not _king_safe_cached(board, turn, king_safe_cache)) else 0.0
+def _quiesce_evasions(
+    pos: Position,
+    alpha,
+    beta,
+    score_cache: BoundedCache,
+    king_safe_cache: BoundedCache,
+    node_cap: int,
+    ply: int,
+    ctx: Optional[_SearchCtx],
+):
+    """In check there is no standing pat: every evasion is searched, and none is mate."""
+    moves = list(legal_moves(pos))
+    if not moves:
+        return -MATE_SCORE + ply
+    moves.sort(key=mvv_lva, reverse=True)
+    for i, m in enumerate(moves):
+        if i >= node_cap:
+            break
+        pos.make_move(m)
+        score = -quiesce(pos, -beta, -alpha, score_cache, king_safe_cache, node_cap, ply + 1, ctx)
+        pos.unmake_move()
+        if score >= beta:
+            return beta
+        if score > alpha:
+            alpha = score
     return alpha
 
+TT_DEFAULT_MB = 16
+TT_BUCKET = 4  # entries per bucket; a store evicts the least useful one
+_MATE_BOUND = MATE_SCORE - 1000
+
+# PVS null-window width; must stay below the evaluation's 0.1-pawn granularity.
+PVS_WINDOW = 0.01
+# Aspiration window around the previous iteration's score (pawns); it grows 4x per
+# failure and opens fully beyond ASPIRATION_MAX.
+ASPIRATION_WINDOW = 0.5
+ASPIRATION_MAX = 8.0
+
+# Selective search. Null-move pruning lets the opponent move twice and cuts when a
+# search reduced by NULL_MOVE_R still holds beta; late move reductions search quiet
+# moves ordered after the first LMR_FULL_MOVES one ply shallower (two when late and
+# deep enough) and re-search at full depth if they beat alpha.
+NULL_MOVE = True
+NULL_MOVE_R = 2
+NULL_MOVE_MIN_DEPTH = 3
+LMR = True
+LMR_MIN_DEPTH = 3
+LMR_FULL_MOVES = 3
+
+# Frontier pruning margins in pawns, keyed by remaining depth. Futility: at these
+# depths, quiet non-checking moves are skipped once static eval + margin can't reach
+# alpha. Razoring: a non-PV node this far below alpha drops into quiescence and
+# returns its score if that confirms the fail-low.
+FUTILITY_MARGINS = {1: 1.5}
+RAZOR_MARGINS = {2: 3.5}
+
+# Each slot is four uint64 words: key, data (move | depth << 32 | bound << 40 |
+# age << 48), the score's float64 bits, and key ^ data ^ score. A slot is only read
+# back if that last word checks out, so one half-written by another process (see
+# SharedTranspositionTable) is a miss rather than a wrong move or score.
+_TT_WORDS = 4
+_TT_SLOT_BYTES = 8 * _TT_WORDS
+_BOUND_CODE = {"EXACT": 1, "LOWER": 2, "UPPER": 3}
+_BOUND_NAME = (None, "EXACT", "LOWER", "UPPER")
+_F64 = struct.Struct("<d")
+_U64 = struct.Struct("<Q")
+
 @dataclass
 class _TTEntry:
     depth: int
     score: float
     flag: str  # "EXACT" | "LOWER" | "UPPER"
-    best: Optional[tuple]
-    board: tuple
+    best: Optional[Move]
 
-_TTKey = Tuple[int, str]
-_TransTable = Dict[_TTKey, _TTEntry]
+class TranspositionTable:
+    """
+    Bounded transposition table keyed by Position.hash.
 
-_Z_RNG = random.Random(0)
-_Z_SQ = [_Z_RNG.getrandbits(64) for _ in range(64)]
-_Z_PIECE: Dict[str, int] = {}
+    Entries live in one preallocated NumPy array of buckets indexed by the low bits
+    of the hash, so memory is fixed by `size_mb` however long the game runs. Keep one
+    table per game and pass it to every search: later moves then start from what
+    earlier ones learned instead of from an empty table.
 
-def _z_piece(p: str) -> int:
-    v = _Z_PIECE.get(p)
-    if v is None:
-        v = _Z_RNG.getrandbits(64)
-        _Z_PIECE[p] = v
-    return v
+    Within a bucket a store reuses the slot of the same position, else an empty one,
+    else evicts the entry from the oldest search (`generation`), breaking ties by the
+    shallowest depth.
+    """
+
+    def __init__(self, size_mb: float = TT_DEFAULT_MB):
+        self.resize(size_mb)
+
+    def resize(self, size_mb: float) -> None:
+        """Reallocate for a new memory budget (drops all entries)."""
+        n = max(256, int(size_mb * 1024 * 1024) // (_TT_SLOT_BYTES * TT_BUCKET))
+        n = 1 << (n.bit_length() - 1)  # power of two, so a mask replaces the modulo
+        self.size_mb = size_mb
+        self._table = self._allocate(n)
+        self._mask = n - 1
+        self.used = 0
+        self.generation = 0
+
+    def _allocate(self, buckets: int) -> np.ndarray:
+        return np.zeros((buckets, TT_BUCKET, _TT_WORDS), dtype=np.uint64)
+
+    def clear(self) -> None:
+        self._table.fill(0)
+        self.used = 0
+        self.generation = 0
+
+    def new_search(self) -> None:
+        """Call once per search; ages everything stored so far."""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def __len__(self) -> int:
+        return self.used
+
+    @property
+    def nbytes(self) -> int:
+        return self._table.nbytes
+
+    def hashfull(self) -> int:
+        """Permille of the first 1000 slots filled by the current search (UCI `hashfull`)."""
+        data = self._table.reshape(-1, _TT_WORDS)[:1000, 1]
+        filled = ((data >> np.uint64(40)) & np.uint64(0xFF)) != 0
+        current = ((data >> np.uint64(48)) & np.uint64(0xFF)) == self.generation
+        return int(np.count_nonzero(filled & current) * 1000 // len(data))
+
+    def probe(self, key: int, ply: int = 0) -> Optional[_TTEntry]:
+        for k, data, bits, check in self._table[key & self._mask].tolist():
+            if k != key or check != k ^ data ^ bits:
+                continue
+            bound = (data >> 40) & 0xFF
+            if not bound:
+                return None
+            score = _F64.unpack(_U64.pack(bits))[0]
+            if abs(score) >= _MATE_BOUND:
+                # Mate scores are stored relative to the node; rebase them on this search's ply.
+                score = score - ply if score > 0 else score + ply
+            move = data & 0xFFFFFFFF
+            depth = (data >> 32) & 0xFF
+            return _TTEntry(depth - 256 if depth > 127 else depth, score, _BOUND_NAME[bound], unpack_move(move) if move else None)
+        return None
+
+    def store(self, key: int, depth: int, score: float, flag: str, best: Optional[Move], ply: int = 0) -> None:
+        idx = key & self._mask
+        rows = self._table[idx].tolist()
+        valid = [check == k ^ data ^ bits and (data >> 40) & 0xFF != 0 for k, data, bits, check in rows]
+        j = next((i for i in range(TT_BUCKET) if valid[i] and rows[i][0] == key), None)
+        if j is not None:
+            move = pack_move(best) if best is not None else rows[j][1] & 0xFFFFFFFF
+        else:
+            if not all(valid):
+                j = valid.index(False)
+                self.used += 1
+            else:
+                gen = self.generation
+                # Oldest search first (uint8 wrap-around), then shallowest.
+                j = max(range(TT_BUCKET), key=lambda i: (((gen - (rows[i][1] >> 48)) & 0xFF), -((rows[i][1] >> 32) & 0xFF)))
+            move = pack_move(best) if best is not None else 0
+        if abs(score) >= _MATE_BOUND:
+            score = score + ply if score > 0 else score - ply
+        data = move | ((depth & 0xFF) << 32) | (_BOUND_CODE[flag] << 40) | (self.generation << 48)
+        bits = _U64.unpack(_F64.pack(score))[0]
+        self._table[idx, j] = (key, data, bits, key ^ data ^ bits)
+
+def new_transposition_table(size_mb: float = TT_DEFAULT_MB, threads: int = 1) -> TranspositionTable:
+    """A table for searches with `threads` processes: shared memory only when needed."""
+    return SharedTranspositionTable(size_mb) if threads > 1 else TranspositionTable(size_mb)
+
+# Segments this process has attached to, by name (helpers see one per game table).
+_attached_shm: "OrderedDict[str, Tuple[shared_memory.SharedMemory, int]]" = OrderedDict()
+_MAX_ATTACHED_SHM = 8
+
+def _attach_shm(name: str, buckets: int) -> shared_memory.SharedMemory:
+    hit = _attached_shm.get(name)
+    if hit is not None and hit[1] == buckets:
+        _attached_shm.move_to_end(name)
+        return hit[0]
+    shm = shared_memory.SharedMemory(name=name)
+    _attached_shm[name] = (shm, buckets)
+    while len(_attached_shm) > _MAX_ATTACHED_SHM:
+        old, _ = _attached_shm.popitem(last=False)[1]
+        try:
+            old.close()
+        except BufferError:
+            pass
+    return shm
+
+def _release_shm(shm: shared_memory.SharedMemory, owner_pid: int) -> None:
+    try:
+        shm.close()
+    except BufferError:
+        pass
+    if os.getpid() == owner_pid:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    TranspositionTable in multiprocessing.shared_memory, for Lazy SMP search.
+
+    It pickles as the segment name, so passing it to a helper process attaches the
+    helper to the same buckets; every process reads and writes them without locks,
+    relying on the per-slot check word. One extra word after the table is a stop
+    flag the main search raises when helpers should give up. The process that
+    created the segment unlinks it when the table is garbage collected.
+    `used` only counts this process's stores.
+    """
+
+    _shm: Optional[shared_memory.SharedMemory] = None
+
+    def _allocate(self, buckets: int) -> np.ndarray:
+        self._table = self._stop = None
+        if self._shm is not None:
+            self._finalizer()
+        nbytes = buckets * TT_BUCKET * _TT_SLOT_BYTES
+        self._shm = shared_memory.SharedMemory(create=True, size=nbytes + 8)
+        self._finalizer = weakref.finalize(self, _release_shm, self._shm, os.getpid())
+        return self._bind(buckets, zero=True)
+
+    def _bind(self, buckets: int, zero: bool = False) -> np.ndarray:
+        buf = self._shm.buf
+        table = np.ndarray((buckets, TT_BUCKET, _TT_WORDS), dtype=np.uint64, buffer=buf)
+        self._stop = np.ndarray((1,), dtype=np.uint64, buffer=buf, offset=table.nbytes)
+        if zero:
+            table.fill(0)
+            self._stop[0] = 0
+        return table
 
-def _zobrist(board) -> int:
-    h = 0
-    for i, p in enumerate(board):
-        if p:
-            h ^= (_Z_SQ[i] ^ _z_piece(p))
-    return h
+    def __getstate__(self):
+        return {"name": self._shm.name, "buckets": self._mask + 1, "size_mb": self.size_mb, "generation": self.generation}
+
+    def __setstate__(self, state):
+        self._shm = _attach_shm(state["name"], state["buckets"])
+        self._table = self._bind(state["buckets"])
+        self._mask = state["buckets"] - 1
+        self.size_mb = state["size_mb"]
+        self.generation = state["generation"]
+        self.used = 0
+
+    def new_search(self) -> None:
+        super().new_search()
+        self._stop[0] = 0
+
+    def request_stop(self) -> None:
+        self._stop[0] = 1
+
+    def stop_requested(self) -> bool:
+        return bool(self._stop[0])
+
+class _StopFlag:
+    """
+    One word of shared memory that a split search raises to stop the root-move
+    searches already running in helper processes. Like SharedTranspositionTable it
+    pickles as the segment name, so `flag.is_set` can be handed to a helper as the
+    abort callback of its search.
+    """
+
+    def __init__(self):
+        self._shm = shared_memory.SharedMemory(create=True, size=8)
+        self._finalizer = weakref.finalize(self, _release_shm, self._shm, os.getpid())
+        self._word = np.ndarray((1,), dtype=np.uint64, buffer=self._shm.buf)
+        self._word[0] = 0
+
+    def __getstate__(self):
+        return {"name": self._shm.name}
+
+    def __setstate__(self, state):
+        self._shm = _attach_shm(state["name"], 0)
+        self._word = np.ndarray((1,), dtype=np.uint64, buffer=self._shm.buf)
+
+    def set(self) -> None:
+        self._word[0] = 1
+
+    def is_set(self) -> bool:
+        return bool(self._word[0])
 
 class _SearchTimeout(Exception):
     pass
 
+def _butterfly() -> Tuple[List[int], List[int]]:
+    """Per-side counters indexed by from * 64 + to."""
+    return ([0] * 4096, [0] * 4096)
+
 @dataclass
 class _SearchCtx:
     deadline: Optional[float]
@@ -308,91 +548,230 @@ class _SearchCtx:
     tt_hits: int = 0
     movegen_calls: int = 0
     movegen_positions: int = 0
+    see_pruned: int = 0
+    delta_pruned: int = 0
+    pvs_researches: int = 0
+    aspiration_researches: int = 0
+    null_tries: int = 0
+    null_cutoffs: int = 0
+    lmr_reduced: int = 0
+    lmr_researches: int = 0
+    futility_pruned: int = 0
+    razored: int = 0
+    null_move: bool = NULL_MOVE
+    lmr: bool = LMR
+    # Polled with the deadline; returning True abandons the search like a timeout.
+    abort: Optional[Callable[[], bool]] = None
     check_every: int = 2048
+    # Quiet-move ordering memory, filled from beta cutoffs and kept across iterations:
+    # two killer slots per ply, butterfly history per side, and the reply that refuted
+    # each (side, previous move).
+    killers: List[List[Optional[Move]]] = field(default_factory=list)
+    history: Tuple[List[int], List[int]] = field(default_factory=_butterfly)
+    counters: Tuple[List[Optional[Move]], List[Optional[Move]]] = field(
+        default_factory=lambda: ([None] * 4096, [None] * 4096)
+    )
 
     def tick(self, in_quiesce: bool = False):
         self.nodes += 1
         if in_quiesce:
             self.qnodes += 1
-        if self.deadline is None:
-            return
-        if (self.nodes % self.check_every) == 0 and time.perf_counter() >= self.deadline:
-            raise _SearchTimeout()
+        if (self.nodes % self.check_every) == 0:
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                raise _SearchTimeout()
+            if self.abort is not None and self.abort():
+                raise _SearchTimeout()
+
+    def killers_at(self, ply: int) -> List[Optional[Move]]:
+        while len(self.killers) <= ply:
+            self.killers.append([None, None])
+        return self.killers[ply]
 
-def _legal_moves_flat(turn: str, board, botWhite, gameStates) -> List[tuple]:
-    all_moves = getAllTeamMoves(turn, board, botWhite, gameStates)
-    return [m for ms in all_moves for m in ms if isKingSafe(m, turn)]
+    def counter_for(self, pos: Position) -> Optional[Move]:
+        prev = pos.last_move
+        return self.counters[pos.side][prev.frm * 64 + prev.to] if prev is not None else None
 
-def _legal_moves_flat_cached(turn: str, board, botWhite, gameStates, king_safe_cache: _KingSafeCache) -> List[tuple]:
-    all_moves = getAllTeamMoves(turn, board, botWhite, gameStates)
-    return [m for ms in all_moves for m in ms if _king_safe_cached(m, turn, king_safe_cache)]
+    def record_cutoff(self, pos: Position, m: Move, depth: int, ply: int) -> None:
+        """Remember quiet move `m` (not yet played in `pos`) as having caused a beta cutoff."""
+        k = self.killers_at(ply)
+        if k[0] != m:
+            k[1] = k[0]
+            k[0] = m
+        self.history[pos.side][m.frm * 64 + m.to] += depth * depth
+        prev = pos.last_move
+        if prev is not None:
+            self.counters[pos.side][prev.frm * 64 + prev.to] = m
 
-def _order_score(prev_board, next_board, turn: str, botWhite, gameStates, king_safe_cache: _KingSafeCache) -> float:
+def _legal_moves_flat(pos: Position) -> List[Move]:
+    return list(legal_moves(pos))
+
+def _order_score(pos: Position, m: Move, base: int) -> float:
     """
     Cheap-ish move ordering heuristic.
-    Higher is better for the side `turn` (negamax viewpoint).
+    Higher is better for the side to move (negamax viewpoint).
+    `base` is pos.psq_sum; the child's value is derived from the move alone.
     """
-    s = _material_positional(next_board, botWhite, gameStates)  # bot-centric
-    if turn == "player":
+    s = (base + pos.psq_delta(m)) / 10.0  # bot-centric
+    if pos.side == PLAYER:
         s = -s
-    if _is_capture(prev_board, next_board, turn):
-        s += 0.75
-    if not _king_safe_cached(next_board, _opponent(turn), king_safe_cache):
+    if gives_check(pos, m):
         s += 0.25
     return s
 
+def _good_capture(pos: Position, m: Move) -> bool:
+    """SEE >= 0; taking something at least as valuable as the capturer can't lose material."""
+    return SEE_VALUE[KIND[m.captured]] >= SEE_VALUE[KIND[m.moved]] or see(pos, m) >= 0
+
 def _ordered_moves(
-    turn: str,
-    board,
-    botWhite,
-    gameStates,
-    tt: _TransTable,
+    pos: Position,
+    tt: TranspositionTable,
     depth: int,
-    king_safe_cache: _KingSafeCache,
     ctx: Optional[_SearchCtx],
-) -> List[tuple]:
+    ply: int = 0,
+) -> List[Move]:
+    """
+    TT move, then winning/equal captures and promotions by MVV-LVA, then killers and
+    the counter-move, then the remaining quiets by history, and losing captures
+    (negative SEE) last. _order_score breaks ties within each group.
+    """
+    moves = _legal_moves_flat(pos)
+    if not moves:
+        return moves
+
+    base = _attach_eval(pos).psq_sum
     if ctx is not None:
         ctx.movegen_calls += 1
         ctx.movegen_positions += 1
-    moves = _legal_moves_flat_cached(turn, board, botWhite, gameStates, king_safe_cache)
-    if not moves:
-        return moves
+        killer1, killer2 = ctx.killers_at(ply)
+        counter = ctx.counter_for(pos)
+        history = ctx.history[pos.side]
+    else:
+        killer1 = killer2 = counter = None
+        history = _butterfly()[0]
+
+    def rank(m: Move):
+        s = _order_score(pos, m, base)
+        if m.captured or m.promo:
+            if _good_capture(pos, m):
+                return (4, mvv_lva(m), s)
+            return (0, see(pos, m), s)
+        if m == killer1:
+            return (3, 2, s)
+        if m == killer2:
+            return (3, 1, s)
+        if m == counter:
+            return (3, 0, s)
+        return (2, history[m.frm * 64 + m.to], s)
 
-    key: _TTKey = (_zobrist(board), turn)
-    entry = tt.get(key)
-    tt_best = entry.best if (entry is not None and entry.board == board) else None
+    moves.sort(key=rank, reverse=True)
+    entry = tt.probe(pos.hash)
+    tt_best = entry.best if entry is not None else None
     if tt_best is not None and tt_best in moves:
         moves.remove(tt_best)
-        moves.sort(key=lambda m: _order_score(board, m, turn, botWhite, gameStates, king_safe_cache), reverse=True)
         return [tt_best] + moves
-
-    moves.sort(key=lambda m: _order_score(board, m, turn, botWhite, gameStates, king_safe_cache), reverse=True)
     return moves
 
+def _playable(pos: Position, m: Move) -> bool:
+    """Legality test for a remembered move without generating the node's moves."""
+    return is_pseudo_legal(pos, m) and (bool(m.flags & CASTLE) or is_legal(pos, m))
+
+def _staged_moves(pos: Position, tt_move: Optional[Move], ctx: Optional[_SearchCtx], ply: int) -> Iterator[Move]:
+    """
+    Legal moves for an interior node, best first, generated only as far as needed:
+    the TT move (verified on its own), winning/equal captures by MVV-LVA, killers and
+    the counter-move, quiets picked one at a time by history, then losing captures.
+
+    The caller must unmake each move before asking for the next one.
+    """
+    tried: List[Move] = []
+    if tt_move is not None and _playable(pos, tt_move):
+        tried.append(tt_move)
+        yield tt_move
+
+    if ctx is not None:
+        ctx.movegen_calls += 1
+    good: List[Move] = []
+    bad: List[Move] = []
+    for m in legal_moves(pos, noisy=True):
+        if m not in tried:
+            (good if _good_capture(pos, m) else bad).append(m)
+    good.sort(key=mvv_lva, reverse=True)
+    yield from good
+
+    history = None
+    if ctx is not None:
+        history = ctx.history[pos.side]
+        for m in (*ctx.killers_at(ply), ctx.counter_for(pos)):
+            if m is not None and m not in tried and _playable(pos, m):
+                tried.append(m)
+                yield m
+
+    quiets = [m for m in legal_moves(pos, noisy=False) if m not in tried]
+    if ctx is not None:
+        ctx.movegen_positions += 1
+    sign = 1 if pos.side == BOT else -1
+    keys = [((history[m.frm * 64 + m.to] if history else 0), sign * pos.psq_delta(m)) for m in quiets]
+    while quiets:
+        # Selection sort: a cutoff after the first few quiets never pays for a full sort.
+        i = max(range(len(keys)), key=keys.__getitem__)
+        m = quiets[i]
+        quiets[i] = quiets[-1]
+        keys[i] = keys[-1]
+        quiets.pop()
+        keys.pop()
+        yield m
+
+    bad.sort(key=lambda m: see(pos, m), reverse=True)
+    yield from bad
+
+def _pvs_child(
+    pos: Position,
+    depth: int,
+    alpha: float,
+    beta: float,
+    first: bool,
+    tt: TranspositionTable,
+    score_cache: BoundedCache,
+    king_safe_cache: BoundedCache,
+    ply: int,
+    ctx: Optional[_SearchCtx],
+) -> float:
+    """
+    Score of the child just made, from the parent's side. The first move gets the
+    full window; later ones only have to prove they can't beat alpha, and are
+    searched again with the full window when they can.
+    """
+    if first:
+        return -_negamax(pos, depth, -beta, -alpha, tt, score_cache, king_safe_cache, ply, ctx)
+    score = -_negamax(pos, depth, -alpha - PVS_WINDOW, -alpha, tt, score_cache, king_safe_cache, ply, ctx)
+    if alpha < score < beta:
+        if ctx is not None:
+            ctx.pvs_researches += 1
+        score = -_negamax(pos, depth, -beta, -alpha, tt, score_cache, king_safe_cache, ply, ctx)
+    return score
+
 def _negamax(
-    board,
-    turn: str,
+    pos: Position,
     depth: int,
     alpha: float,
     beta: float,
-    botWhite,
-    gameStates,
-    tt: _TransTable,
-    score_cache: _ScoreCache,
-    king_safe_cache: _KingSafeCache,
+    tt: TranspositionTable,
+    score_cache: BoundedCache,
+    king_safe_cache: BoundedCache,
     ply: int,
     ctx: Optional[_SearchCtx] = None,
 ) -> float:
     if ctx is not None:
         ctx.tick()
-    if depth == 0:
-        return quiesce(board, turn, alpha, beta, botWhite, gameStates, score_cache, king_safe_cache, ply=ply, ctx=ctx)
+    if depth <= 0:
+        return quiesce(pos, alpha, beta, score_cache, king_safe_cache, ply=ply, ctx=ctx)
+    pv_node = beta - alpha > 2 * PVS_WINDOW
 
-    key: _TTKey = (_zobrist(board), turn)
-    entry = tt.get(key)
+    key = pos.hash
+    entry = tt.probe(key, ply)
     if ctx is not None:
         ctx.tt_probes += 1
-    if entry is not None and entry.board == board and entry.depth >= depth:
+    if entry is not None and entry.depth >= depth:
         if ctx is not None:
             ctx.tt_hits += 1
         if entry.flag == "EXACT":
@@ -404,155 +783,589 @@ def _negamax(
         if alpha >= beta:
             return entry.score
 
+    in_check = not _king_safe_cached(pos, pos.side, king_safe_cache)
+    if (
+        ctx is not None
+        and ctx.null_move
+        and not pv_node
+        and not in_check
+        and depth >= NULL_MOVE_MIN_DEPTH
+        and pos.last_move is not None  # never two null moves in a row
+        and abs(beta) < _MATE_BOUND
+        and _has_non_pawn_material(pos, pos.side)
+        and _eval_for_side_to_move(pos, score_cache) >= beta
+    ):
+        ctx.null_tries += 1
+        pos.make_null_move()
+        score = -_negamax(pos, depth - 1 - NULL_MOVE_R, -beta, -beta + PVS_WINDOW, tt, score_cache, king_safe_cache, ply + 1, ctx)
+        pos.unmake_null_move()
+        if score >= beta:
+            ctx.null_cutoffs += 1
+            return beta
+
+    futile = False
+    if not in_check and abs(alpha) < _MATE_BOUND and abs(beta) < _MATE_BOUND:
+        razor = RAZOR_MARGINS.get(depth)
+        futility = FUTILITY_MARGINS.get(depth)
+        if razor is not None or futility is not None:
+            static = _eval_for_side_to_move(pos, score_cache)
+            if razor is not None and not pv_node and static + razor <= alpha:
+                score = quiesce(pos, alpha, beta, score_cache, king_safe_cache, ply=ply, ctx=ctx)
+                if score <= alpha:
+                    if ctx is not None:
+                        ctx.razored += 1
+                    return score
+            futile = futility is not None and static + futility <= alpha
+
     alpha_orig = alpha
     beta_orig = beta
-    best_move = None
+    best_move: Optional[Move] = None
     best_score = float("-inf")
 
-    moves = _ordered_moves(turn, board, botWhite, gameStates, tt, depth, king_safe_cache, ctx)
-    if not moves:
-        # No legal moves: checkmate if in check, else stalemate.
-        return (-MATE_SCORE + ply) if (not _king_safe_cached(board, turn, king_safe_cache)) else 0.0
-
-    nxt = _opponent(turn)
-    for m in moves:
-        score = -_negamax(
-            m,
-            nxt,
-            depth - 1,
-            -beta,
-            -alpha,
-            botWhite,
-            gameStates,
-            tt,
-            score_cache,
-            king_safe_cache,
-            ply + 1,
-            ctx,
-        )
+    reducible = ctx is not None and ctx.lmr and depth >= LMR_MIN_DEPTH and not in_check
+    if reducible:
+        spared = (*ctx.killers_at(ply), ctx.counter_for(pos))
+    searched = 0
+    for m in _staged_moves(pos, entry.best if entry is not None else None, ctx, ply):
+        searched += 1
+        pos.make_move(m)
+        if (
+            futile
+            and searched > 1
+            and not (m.captured or m.promo)
+            and _king_safe_cached(pos, pos.side, king_safe_cache)
+        ):
+            pos.unmake_move()
+            if ctx is not None:
+                ctx.futility_pruned += 1
+            continue
+        if (
+            reducible
+            and searched > LMR_FULL_MOVES
+            and not (m.captured or m.promo)
+            and m not in spared
+            and _king_safe_cached(pos, pos.side, king_safe_cache)  # doesn't give check
+        ):
+            r = 2 if (depth >= 5 and searched > 2 * LMR_FULL_MOVES) else 1
+            ctx.lmr_reduced += 1
+            score = -_negamax(pos, depth - 1 - r, -alpha - PVS_WINDOW, -alpha, tt, score_cache, king_safe_cache, ply + 1, ctx)
+            if score > alpha:
+                ctx.lmr_researches += 1
+                score = _pvs_child(pos, depth - 1, alpha, beta, False, tt, score_cache, king_safe_cache, ply + 1, ctx)
+        else:
+            score = _pvs_child(pos, depth - 1, alpha, beta, searched == 1, tt, score_cache, king_safe_cache, ply + 1, ctx)
+        pos.unmake_move()
         if score > best_score:
             best_score = score
             best_move = m
         if score > alpha:
             alpha = score
         if alpha >= beta:
+            if ctx is not None and not (m.captured or m.promo):
+                ctx.record_cutoff(pos, m, depth, ply)
             break
 
+    if not searched:
+        # No legal moves: checkmate if in check, else stalemate.
+        return (-MATE_SCORE + ply) if in_check else 0.0
+
     flag = "EXACT"
     if best_score <= alpha_orig:
         flag = "UPPER"
     elif best_score >= beta_orig:
         flag = "LOWER"
-    tt[key] = _TTEntry(depth=depth, score=best_score, flag=flag, best=best_move, board=board)
+    tt.store(key, depth, best_score, flag, best_move, ply)
     return best_score
 
 def _root_search(
-    board,
-    turn: str,
+    pos: Position,
     depth: int,
-    botWhite,
-    gameStates,
-    tt: _TransTable,
-    score_cache: _ScoreCache,
-    king_safe_cache: _KingSafeCache,
+    tt: TranspositionTable,
+    score_cache: BoundedCache,
+    king_safe_cache: BoundedCache,
     ctx: Optional[_SearchCtx],
-) -> Optional[tuple]:
-    moves = _ordered_moves(turn, board, botWhite, gameStates, tt, depth, king_safe_cache, ctx)
+    alpha: float = float("-inf"),
+    beta: float = float("inf"),
+) -> Optional[Tuple[Move, float]]:
+    """
+    Best root move and its score within (alpha, beta). A score at or outside the
+    window is only a bound; _aspiration_search widens and searches again.
+    """
+    moves = _ordered_moves(pos, tt, depth, ctx)
     if not moves:
         return None
-    alpha = float("-inf")
-    beta = float("inf")
-    best_move: Optional[tuple] = None
+    alpha_orig = alpha
+    best_move: Optional[Move] = None
     best_score: float = float("-inf")
-    nxt = _opponent(turn)
-    for m in moves:
-        score = -_negamax(
-            m,
-            nxt,
-            depth - 1,
-            -beta,
-            -alpha,
-            botWhite,
-            gameStates,
-            tt,
-            score_cache,
-            king_safe_cache,
-            ply=1,
-            ctx=ctx,
-        )
+    for i, m in enumerate(moves):
+        pos.make_move(m)
+        score = _pvs_child(pos, depth - 1, alpha, beta, i == 0, tt, score_cache, king_safe_cache, 1, ctx)
+        pos.unmake_move()
         if score > best_score:
             best_score = score
             best_move = m
         if score > alpha:
             alpha = score
+        if alpha >= beta:
+            break
     # Store the PV move at the root too.
-    tt[(_zobrist(board), turn)] = _TTEntry(depth=depth, score=best_score, flag="EXACT", best=best_move, board=board)
+    flag = "EXACT"
+    if best_score <= alpha_orig:
+        flag = "UPPER"
+    elif best_score >= beta:
+        flag = "LOWER"
+    tt.store(pos.hash, depth, best_score, flag, best_move)
     return best_move, best_score
 
-def calculateMove(board, botWhite, gameStates, turn: str, depth: int, time_limit_s: Optional[float] = None) -> Optional[tuple]:
-    tt: _TransTable = {}
-    score_cache: _ScoreCache = {}
-    king_safe_cache: _KingSafeCache = {}
-    best = None
+def _aspiration_search(
+    pos: Position,
+    depth: int,
+    prev: Optional[float],
+    tt: TranspositionTable,
+    score_cache: BoundedCache,
+    king_safe_cache: BoundedCache,
+    ctx: Optional[_SearchCtx],
+) -> Optional[Tuple[Move, float]]:
+    """_root_search in a narrow window around the previous iteration's score `prev`."""
+    if prev is None or abs(prev) >= _MATE_BOUND:
+        return _root_search(pos, depth, tt, score_cache, king_safe_cache, ctx)
+    delta = ASPIRATION_WINDOW
+    alpha, beta = prev - delta, prev + delta
+    while True:
+        res = _root_search(pos, depth, tt, score_cache, king_safe_cache, ctx, alpha, beta)
+        if res is None:
+            return None
+        score = res[1]
+        if alpha < score < beta:
+            return res
+        if ctx is not None:
+            ctx.aspiration_researches += 1
+        delta *= 4
+        if score <= alpha:
+            alpha = float("-inf") if delta > ASPIRATION_MAX else score - delta
+        else:
+            beta = float("inf") if delta > ASPIRATION_MAX else score + delta
 
-    # If the side to move has no legal moves, this is terminal (checkmate or stalemate).
-    terminal = checkCheckmateOrStalemate(board, turn, botWhite, gameStates)
-    if terminal in ("checkmate", "stalemate"):
-        return None
+def principal_variation(pos: Position, tt: TranspositionTable, first: Move, max_len: int) -> List[Move]:
+    """
+    `first` followed by the best moves the TT holds for the positions it leads to,
+    up to `max_len` moves, stopping at a missing or illegal entry or a repetition.
+    """
+    pv: List[Move] = []
+    seen = {pos.hash}
+    m: Optional[Move] = first
+    while m is not None and len(pv) < max_len and is_pseudo_legal(pos, m) and is_legal(pos, m):
+        pos.make_move(m)
+        pv.append(m)
+        if pos.hash in seen:
+            break
+        seen.add(pos.hash)
+        entry = tt.probe(pos.hash)
+        m = entry.best if entry is not None else None
+    for _ in pv:
+        pos.unmake_move()
+    return pv
 
-    # Always keep *some* legal move available as a fallback in case the search bails out
-    # early (timeouts, edge-case TT cutoffs, etc.). We only return None on true terminals.
-    def _fallback_legal_move() -> Optional[tuple]:
-        all_moves = getAllTeamMoves(turn, board, botWhite, gameStates)
-        for ms in all_moves:
-            for m in ms:
-                if _king_safe_cached(m, turn, king_safe_cache):
-                    return m
+def mate_distance(score: float) -> Optional[int]:
+    """Plies to mate for a search score, negative when the side to move is mated; None if no mate."""
+    if abs(score) < _MATE_BOUND:
         return None
+    plies = int(round(MATE_SCORE - abs(score)))
+    return plies if score > 0 else -plies
 
-    fallback = _fallback_legal_move()
+@dataclass
+class IterationInfo:
+    """What search_position's `on_iteration` callback gets after each completed depth."""
+    depth: int
+    score: float  # pawns, from the side to move
+    nodes: int
+    seconds: float
+    pv: List[Move]
+    hashfull: int
 
-    deadline = (time.perf_counter() + time_limit_s) if time_limit_s is not None else None
-    ctx = _SearchCtx(deadline=deadline) if deadline is not None else None
-    for d in range(1, depth + 1):
+def _deepen(
+    pos: Position,
+    depths: range,
+    tt: TranspositionTable,
+    score_cache: BoundedCache,
+    king_safe_cache: BoundedCache,
+    ctx: _SearchCtx,
+    debug: bool = False,
+    on_iteration: Optional[Callable[[IterationInfo], None]] = None,
+) -> Tuple[Optional[Move], Optional[float], int]:
+    """
+    Iterative deepening over `depths`. Returns the best move and score of the last
+    iteration that finished before a timeout or abort, and its depth (0 if none did).
+    """
+    best: Optional[Move] = None
+    score: Optional[float] = None
+    reached = 0
+    started = time.perf_counter()
+    for d in depths:
         try:
-            res = _root_search(board, turn, d, botWhite, gameStates, tt, score_cache, king_safe_cache, ctx)
+            t0 = time.perf_counter()
+            res = _aspiration_search(pos, d, score, tt, score_cache, king_safe_cache, ctx)
+            dt = time.perf_counter() - t0
         except _SearchTimeout:
+            if debug:
+                logging.info(f"search stopped at d={d}")
             break
-        best = res[0] if res is not None else None
-        if best is None:
-            return None
-    return best if best is not None else fallback
+        if res is None:
+            break
+        best, score = res
+        reached = d
+        if on_iteration is not None:
+            on_iteration(IterationInfo(
+                d, score, ctx.nodes, time.perf_counter() - started, principal_variation(pos, tt, best, d), tt.hashfull()
+            ))
+        if debug:
+            logging.info(
+                f"search d={d} dt={dt:.3f}s nodes={ctx.nodes} qnodes={ctx.qnodes} "
+                f"tt={len(tt)} hashfull={tt.hashfull()} probes={ctx.tt_probes} hits={ctx.tt_hits} see_pruned={ctx.see_pruned} delta_pruned={ctx.delta_pruned} "
+                f"pvs_re={ctx.pvs_researches} asp_re={ctx.aspiration_researches} "
+                f"null={ctx.null_cutoffs}/{ctx.null_tries} lmr={ctx.lmr_reduced} lmr_re={ctx.lmr_researches} "
+                f"futility={ctx.futility_pruned} razored={ctx.razored} "
+                f"eval_cache={score_cache.stats()} king_cache={king_safe_cache.stats()}"
+            )
+    return best, score, reached
 
-def botMove(board, turn, gameStates, botWhite, depth: int = 3, pruneRate: float = 0.20, time_limit_s: Optional[float] = None, debug: bool = False):
-    # `pruneRate` kept for API compatibility; beam pruning was replaced by iterative deepening + TT.
-    # Thread debug flag into calculateMove via a local closure.
-    if not debug:
-        return calculateMove(board, botWhite, gameStates, turn, depth, time_limit_s=time_limit_s)
-
-    tt: _TransTable = {}
-    score_cache: _ScoreCache = {}
-    king_safe_cache: _KingSafeCache = {}
-    best = None
+# --- Lazy SMP: helper processes searching the same root through a shared TT ---
+
+_helper_pool: Optional[ProcessPoolExecutor] = None
+_helper_pool_size = 0
+# Evaluation caches of a helper process (pure functions of the hash, so safe to keep).
+_process_caches: Optional[SearchCaches] = None
+
+def _helpers(n: int) -> ProcessPoolExecutor:
+    """The process pool for `n` helpers, kept alive between searches."""
+    global _helper_pool, _helper_pool_size
+    if _helper_pool is None or _helper_pool_size != n:
+        if _helper_pool is not None:
+            _helper_pool.shutdown(wait=False, cancel_futures=True)
+        # Not fork: a thread of this process (e.g. a UCI stdin reader) may hold a lock
+        # the child would inherit taken, and deadlock on.
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _helper_pool = ProcessPoolExecutor(max_workers=n, mp_context=multiprocessing.get_context(method))
+        _helper_pool_size = n
+    return _helper_pool
+
+def _smp_helper(
+    pos: Position,
+    depth: int,
+    tt: SharedTranspositionTable,
+    time_limit_s: Optional[float],
+    helper: int,
+    null_move: bool,
+    lmr: bool,
+) -> Tuple[int, int, Optional[float], int]:
+    """
+    One helper's search: (depth reached, packed best move or 0, score, nodes). Odd
+    helpers start and finish one ply deeper than the main search so that the
+    processes spread over different depths instead of all repeating the same one.
+    """
+    global _process_caches
+    if _process_caches is None:
+        _process_caches = SearchCaches.sized()
+    pos = _attach_eval(pos)
     deadline = (time.perf_counter() + time_limit_s) if time_limit_s is not None else None
-    ctx = _SearchCtx(deadline=deadline)
+    ctx = _SearchCtx(deadline=deadline, null_move=null_move, lmr=lmr, abort=tt.stop_requested)
+    skew = helper % 2
+    best, score, reached = _deepen(
+        pos, range(1 + skew, depth + 1 + skew), tt, _process_caches.score, _process_caches.king_safe, ctx
+    )
+    return reached, pack_move(best) if best is not None else 0, score, ctx.nodes
+
+# --- Root splitting: reproducible parallel search for fixed-depth analysis ---
+
+SPLIT_TT_MB = 4  # private table for each root move's search
+
+def _split_child(
+    child: Position,
+    depth: int,
+    alpha: float,
+    beta: float,
+    null_move: bool,
+    lmr: bool,
+    abort: Optional[Callable[[], bool]] = None,
+) -> Tuple[Optional[float], int, int]:
+    """
+    Score of root child `child` for the side that just moved, searched `depth` plies
+    deep from an empty table, the nodes spent, and the reply that table ends up
+    preferring (packed, 0 if none). Nothing carries over between calls but the
+    evaluation caches, so the result depends only on the arguments. The score is
+    None if `abort` returned True before the search finished.
+    """
+    if abort is not None and abort():
+        return None, 0, 0
+    global _process_caches
+    if _process_caches is None:
+        _process_caches = SearchCaches.sized()
+    child = _attach_eval(child.copy())
+    tt = TranspositionTable(SPLIT_TT_MB)
+    ctx = _SearchCtx(deadline=None, null_move=null_move, lmr=lmr, abort=abort)
+    score = 0.0
+    try:
+        for d in range(min(1, depth), depth + 1):
+            score = -_negamax(child, d, -beta, -alpha, tt, _process_caches.score, _process_caches.king_safe, 1, ctx)
+    except _SearchTimeout:
+        return None, ctx.nodes, 0
+    entry = tt.probe(child.hash, 1)
+    reply = pack_move(entry.best) if entry is not None and entry.best is not None else 0
+    return score, ctx.nodes, reply
+
+def split_root_search(
+    pos: Position,
+    depth: int,
+    workers: int = 1,
+    null_move: bool = NULL_MOVE,
+    lmr: bool = LMR,
+    debug: bool = False,
+    tt: Optional[TranspositionTable] = None,
+    on_iteration: Optional[Callable[[IterationInfo], None]] = None,
+    abort: Optional[Callable[[], bool]] = None,
+) -> Optional[Tuple[Move, float]]:
+    """
+    Fixed-depth root search with the root moves spread over `workers` processes.
+
+    Each depth from 1 to `depth` is searched in turn, the previous depth's best move
+    first. That move is searched here with a full window; its score is the bound
+    every other move is tested against with a null window, in parallel, and those
+    that beat it are searched again with (bound, inf). Each root move gets its own
+    empty table and none sees another's results, so the chosen move and score are
+    the same for any `workers` (1 runs the identical search serially) and any
+    scheduling. Returns (move, score) or None when there is no legal move.
+
+    Every completed depth's result and expected reply are stored into `tt` (they
+    never steer the search itself), so a caller can read the PV or a ponder move
+    from it; `on_iteration` gets an IterationInfo for each completed depth.
+
+    `abort` is polled while the root moves are searched (UCI stop). Once it returns
+    True the searches still running are stopped and the last completed depth's move
+    is returned. Depth 1 always completes, in this process.
+    """
+    started = time.perf_counter()
+    pos = _attach_eval(pos.copy())
+    moves = _ordered_moves(pos, TranspositionTable(1), depth, _SearchCtx(deadline=None))
+    if not moves:
+        return None
+    children = {}
+    for m in moves:
+        c = pos.copy()
+        c.make_move(m)
+        children[m] = c
+    stopped = abort if abort is not None else (lambda: False)
+    # Helpers can't call `abort`; they poll a shared flag this process raises for it.
+    flag = _StopFlag() if workers > 1 else None
+
+    def _batch(nodes, d, alpha, beta):
+        """Results for `nodes`, None for those that didn't finish before an abort."""
+        if flag is None or d == 1:
+            results = [_split_child(c, d - 1, alpha, beta, null_move, lmr, guard) for c in nodes]
+        else:
+            pool = _helpers(workers)
+            futures = [pool.submit(_split_child, c, d - 1, alpha, beta, null_move, lmr, flag.is_set) for c in nodes]
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+                if pending and stopped():
+                    flag.set()
+                    for f in pending:
+                        f.cancel()
+                    wait(pending)
+                    break
+            results = [f.result() if f.done() and not f.cancelled() else None for f in futures]
+        return [r if r is not None and r[0] is not None else None for r in results]
+
+    best_move, best_score = moves[0], 0.0
+    nodes = 0
+    if tt is not None:
+        tt.new_search()
     for d in range(1, depth + 1):
-        try:
-            t0 = time.perf_counter()
-            res = _root_search(board, turn, d, botWhite, gameStates, tt, score_cache, king_safe_cache, ctx)
-            dt = time.perf_counter() - t0
-        except _SearchTimeout:
-            logging.info(f"search timeout at d={d} after {time_limit_s}s")
+        # Depth 1 is only quiescence under each move: finish it here whatever `abort` says,
+        # so there is always a searched move to fall back on.
+        guard = stopped if d > 1 else None
+        score, n, reply = _split_child(children[moves[0]], d - 1, float("-inf"), float("inf"), null_move, lmr, guard)
+        nodes += n
+        if score is None:
             break
-        best = res[0] if res is not None else None
-        if best is None:
-            return None
-        logging.info(
-            f"search d={d} dt={dt:.3f}s nodes={ctx.nodes} qnodes={ctx.qnodes} "
-            f"tt={len(tt)} probes={ctx.tt_probes} hits={ctx.tt_hits} "
-            f"eval_cache={len(score_cache)} king_cache={len(king_safe_cache)}"
-        )
-    return best
+        best = 0
+        alpha = score
+        scout = _batch([children[m] for m in moves[1:]], d, alpha, alpha + PVS_WINDOW)
+        raised = [i + 1 for i, r in enumerate(scout) if r is not None and r[0] > alpha]
+        full = _batch([children[moves[i]] for i in raised], d, alpha, float("inf")) if d == 1 or not stopped() else []
+        for i, r in zip(raised, full):
+            if r is not None and r[0] > score:
+                best, score, reply = i, r[0], r[2]
+        nodes += sum(r[1] for r in scout + full if r is not None)
+        if debug:
+            logging.info(f"split d={d} workers={workers} moves={len(moves)} researched={len(raised)} nodes={nodes}")
+        if None in scout + full or len(full) < len(raised):
+            break
+        best_move, best_score = moves[best], score
+        moves.insert(0, moves.pop(best))
+        if tt is not None:
+            tt.store(pos.hash, d, score, "EXACT", best_move)
+            if d > 1:
+                tt.store(children[best_move].hash, d - 1, -score, "EXACT", unpack_move(reply) if reply else None, 1)
+        if on_iteration is not None:
+            pv = principal_variation(pos, tt, best_move, d) if tt is not None else [best_move]
+            on_iteration(IterationInfo(
+                d, score, nodes, time.perf_counter() - started, pv, tt.hashfull() if tt is not None else 0
+            ))
+    return best_move, best_score
+
+def search_position(
+    pos: Position,
+    depth: int,
+    time_limit_s: Optional[float] = None,
+    debug: bool = False,
+    tt: Optional[TranspositionTable] = None,
+    caches: Optional[SearchCaches] = None,
+    null_move: bool = NULL_MOVE,
+    lmr: bool = LMR,
+    threads: int = 1,
+    abort: Optional[Callable[[], bool]] = None,
+    on_iteration: Optional[Callable[[IterationInfo], None]] = None,
+) -> Optional[Move]:
+    """
+    Iterative-deepening search from `pos`. Returns the chosen move, or None if the
+    side to move has no legal move.
+
+    The search plays moves in place with make_move/unmake_move on a private copy,
+    so a timeout part-way down the tree never leaves `pos` half-updated. Pass the
+    game's `tt` and `caches` to reuse what previous searches stored. `null_move` and
+    `lmr` switch the selective parts of the search off for testing or analysis.
+
+    With `threads` > 1, that many - 1 helper processes search the same root at the
+    same time (Lazy SMP), sharing only the transposition table: `tt` must then be a
+    SharedTranspositionTable (see new_transposition_table) or None for a temporary
+    one; a plain table raises TypeError rather than being dropped. Their entries steer
+    this process's search; the move of whichever search completed the deepest
+    iteration is played. Helpers are started with forkserver/spawn, so a script
+    using threads must guard its entry point with `if __name__ == "__main__":`.
+
+    `abort` is polled during the search (UCI stop/ponderhit); once it returns True
+    the move from the last completed iteration is returned. `on_iteration` is called
+    after every completed iteration of this process's search (UCI `info` lines).
+    """
+    pos = _attach_eval(pos.copy())
+    threads = max(1, int(threads))
+    if threads > 1 and tt is not None and not isinstance(tt, SharedTranspositionTable):
+        raise TypeError("threads > 1 needs a SharedTranspositionTable; build it with new_transposition_table()")
+    if threads > 1 and tt is None:
+        tt = SharedTranspositionTable(TT_DEFAULT_MB)
+    elif tt is None:
+        tt = TranspositionTable()
+    tt.new_search()
+    if caches is None:
+        caches = SearchCaches.sized()
+    score_cache, king_safe_cache = caches.score, caches.king_safe
+
+    # Always keep *some* legal move available as a fallback in case the search bails out
+    # early (timeouts, edge-case TT cutoffs, etc.). We only return None on true terminals.
+    fallback = next(legal_moves(pos), None)
+    if fallback is None:
+        return None
+
+    deadline = (time.perf_counter() + time_limit_s) if time_limit_s is not None else None
+    ctx = _SearchCtx(deadline=deadline, null_move=null_move, lmr=lmr, abort=abort)
+    futures = []
+    if threads > 1:
+        pool = _helpers(threads - 1)
+        # Arguments are pickled later by the pool's feeder thread, while this process is
+        # already making moves on `pos`: give each helper a copy of its own.
+        futures = [
+            pool.submit(_smp_helper, pos.copy(), depth, tt, time_limit_s, i, null_move, lmr)
+            for i in range(1, threads)
+        ]
+    try:
+        best, _, reached = _deepen(pos, range(1, depth + 1), tt, score_cache, king_safe_cache, ctx, debug, on_iteration)
+    finally:
+        if futures:
+            tt.request_stop()
+    if futures:
+        helper_nodes = 0
+        depths = []
+        for f in futures:
+            try:
+                h_reached, h_move, _, h_nodes = f.result()
+            except Exception:
+                logging.exception("search helper failed")
+                continue
+            helper_nodes += h_nodes
+            depths.append(h_reached)
+            if h_reached > reached and h_move:
+                best, reached = unpack_move(h_move), h_reached
+        if debug:
+            logging.info(f"smp threads={threads} main_nodes={ctx.nodes} helper_nodes={helper_nodes} helper_depths={depths} played_depth={reached}")
+    return best if best is not None else fallback
+
+def calculateMove(
+    board,
+    botWhite,
+    gameStates,
+    turn: str,
+    depth: int,
+    time_limit_s: Optional[float] = None,
+    debug: bool = False,
+    castling: Optional[int] = None,
+    tt: Optional[TranspositionTable] = None,
+    caches: Optional[SearchCaches] = None,
+    null_move: bool = NULL_MOVE,
+    lmr: bool = LMR,
+    threads: int = 1,
+) -> Optional[tuple]:
+    pos = Position.from_board(board, turn, botWhite, gameStates, castling=castling)
+    best = search_position(
+        pos,
+        depth,
+        time_limit_s=time_limit_s,
+        debug=debug,
+        tt=tt,
+        caches=caches,
+        null_move=null_move,
+        lmr=lmr,
+        threads=threads,
+    )
+    return apply(pos, best).to_board() if best is not None else None
+
+def botMove(
+    board,
+    turn,
+    gameStates,
+    botWhite,
+    depth: int = 3,
+    pruneRate: float = 0.20,
+    time_limit_s: Optional[float] = None,
+    debug: bool = False,
+    castling: Optional[int] = None,
+    tt: Optional[TranspositionTable] = None,
+    caches: Optional[SearchCaches] = None,
+    null_move: bool = NULL_MOVE,
+    lmr: bool = LMR,
+    threads: int = 1,
+):
+    # `pruneRate` kept for API compatibility; beam pruning was replaced by iterative deepening + TT.
+    # `castling` is the CASTLE_* mask the caller tracked over the game (None: infer from placement).
+    # `tt` / `caches` are the game's search tables (None: search with fresh ones).
+    # `null_move` / `lmr` enable null-move pruning and late move reductions.
+    # `threads` > 1 searches with that many processes; `tt` must then come from
+    # new_transposition_table(size_mb, threads), made once per game.
+    return calculateMove(
+        board,
+        botWhite,
+        gameStates,
+        turn,
+        depth,
+        time_limit_s=time_limit_s,
+        debug=debug,
+        castling=castling,
+        tt=tt,
+        caches=caches,
+        null_move=null_move,
+        lmr=lmr,
+        threads=threads,
+    )
 
 def evaluate_move_quality(
     before_board,
@@ -561,38 +1374,56 @@ def evaluate_move_quality(
     botWhite,
     gameStates,
     depth: int = 2,
+    tt: Optional[TranspositionTable] = None,
+    caches: Optional[SearchCaches] = None,
+    workers: Optional[int] = None,
 ) -> Optional[tuple]:
     """
     Return (best_score, played_score) from the perspective of `turn` on `before_board`.
 
     Scores are negamax values ("good for side-to-move").
     `played_score` is the value after choosing `after_board` then letting the opponent play optimally.
+
+    With `workers` set, both are computed by split_root_search / _split_child instead
+    of with `tt`, which makes them reproducible for any number of workers.
     """
     if depth < 1:
         return None
 
-    tt: _TransTable = {}
-    score_cache: _ScoreCache = {}
-    king_safe_cache: _KingSafeCache = {}
-    res = _root_search(before_board, turn, depth, botWhite, gameStates, tt, score_cache, king_safe_cache, None)
+    if workers is not None:
+        before = Position.from_board(before_board, turn, botWhite, gameStates)
+        res = split_root_search(before, depth, workers)
+        if res is None:
+            return None
+        after = Position.from_board(after_board, _opponent(turn), botWhite, list(gameStates) + [after_board])
+        played_score, _, _ = _split_child(after, depth - 1, float("-inf"), float("inf"), NULL_MOVE, LMR)
+        return res[1], played_score
+
+    if tt is None:
+        tt = TranspositionTable()
+    tt.new_search()
+    if caches is None:
+        caches = SearchCaches.sized()
+    score_cache, king_safe_cache = caches.score, caches.king_safe
+    before = _attach_eval(Position.from_board(before_board, turn, botWhite, gameStates))
+    ctx = _SearchCtx(deadline=None)
+    res = _root_search(before, depth, tt, score_cache, king_safe_cache, ctx)
     if res is None:
         return None
     _, best_score = res
 
     # Value of the played move, assuming optimal response from the opponent.
-    opp = _opponent(turn)
+    after = _attach_eval(Position.from_board(after_board, _opponent(turn), botWhite, list(gameStates) + [after_board]))
     played_score = -_negamax(
-        after_board,
-        opp,
+        after,
         depth - 1,
         float("-inf"),
         float("inf"),
-        botWhite,
-        gameStates,
         tt,
         score_cache,
         king_safe_cache,
         ply=1,
+        ctx=ctx,
     )
     return best_score, played_score
 
@@ -0,0 +1,55 @@
+# cache.py
+"""
+Size-bounded LRU cache with hit/miss/eviction counters.
+
+The search memoises evaluation and king-safety results by Position.hash. A plain
+dict grows for as long as the game lasts; this keeps at most `capacity` entries
+and reports how well the chosen size is working.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class BoundedCache:
+    __slots__ = ("capacity", "_data", "hits", "misses", "evictions")
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, int(capacity))
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Cached value or None; a hit marks the entry most recently used."""
+        v = self._data.get(key)
+        if v is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(key)
+        return v
+
+    def put(self, key: Hashable, value: Any) -> None:
+        data = self._data
+        data[key] = value
+        if len(data) > self.capacity:
+            data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> str:
+        return f"{len(self._data)}/{self.capacity} hit={self.hit_rate:.1%} evict={self.evictions}"
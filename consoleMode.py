@@ -1,8 +1,8 @@
 # consoleMode.py
 
-from bot import botMove, scoreMoveForEnemy
+from bot import botMove, scoreMoveForEnemy, SearchCaches, TranspositionTable
 from gameLogic import (
-    newBoard, isKingSafe, detectCheckmate, detectStalemate, moveValidate, movePiece,
+    newBoard, isKingSafe, moveValidate, movePiece,
     findSquare, castle, promotePawn, checkCheckmateOrStalemate
 )
 
@@ -131,13 +131,16 @@ def startGame(botWhite: bool = True):
     turn = "bot" if botWhite else "player"
     other = "player" if turn == "bot" else "bot"
     pruneRate = 0.30
+    # Shared by every bot search this game.
+    tt = TranspositionTable()
+    caches = SearchCaches.sized()
 
     print("\nWelcome to Console Chess!")
     print("Type moves like: 'p2 e4' or 'e2 e4'. Type 'castle' to castle, 'help' for help, 'quit' to exit.")
 
     # If bot starts, make its opening move
     if turn == "bot":
-        mv = botMove(board, turn, gameStates, botWhite, pruneRate=pruneRate)
+        mv = botMove(board, turn, gameStates, botWhite, pruneRate=pruneRate, tt=tt, caches=caches)
         if mv is not None and isKingSafe(mv, turn):
             board = mv
             gameStates.append(board)
@@ -147,19 +150,19 @@ def startGame(botWhite: bool = True):
         print_board(board)
         print(f"Turn: {turn.upper()}")
 
-        if not isKingSafe(board, turn):
-            if detectCheckmate(board, turn, botWhite, gameStates):
-                winner = "bot" if turn == 'player' else "player"
-                print(f"Checkmate! {winner.upper()} wins.")
-                break
-            print("Check!")
-
-        if detectStalemate(board, turn, botWhite, gameStates):
+        status = checkCheckmateOrStalemate(board, turn, botWhite, gameStates)
+        if status == 'checkmate':
+            winner = "bot" if turn == 'player' else "player"
+            print(f"Checkmate! {winner.upper()} wins.")
+            break
+        if status == 'stalemate':
             print("Stalemate! Game over.")
             break
+        if not isKingSafe(board, turn):
+            print("Check!")
 
         if turn == "bot":
-            mv = botMove(board, turn, gameStates, botWhite, pruneRate=pruneRate)
+            mv = botMove(board, turn, gameStates, botWhite, pruneRate=pruneRate, tt=tt, caches=caches)
             if mv is not None and isKingSafe(mv, turn):
                 board = mv
                 gameStates.append(board)
@@ -2,6 +2,9 @@
 import logging
 from typing import Tuple, Optional
 
+from attacks import BISHOP_RAYS, KING_TARGETS, KNIGHT_TARGETS, PAWN_ATTACKS, QUEEN_RAYS, RAYS, ROOK_RAYS
+from position import Position, has_legal_move, in_check
+
 logging.basicConfig(level=logging.DEBUG)
 
 def newBoard(botWhite: bool):
@@ -40,45 +43,16 @@ def findPiece(piece: str, board: Tuple[Optional[str], ...]) -> int:
 def same_side(a: str, b: str) -> bool:
     return (a.isupper() and b.isupper()) or (a.islower() and b.islower())
 
-_KNIGHT_OFFS = (15, 17, -15, -17, 10, 6, -10, -6)
-
 def _same_row(a: int, b: int) -> bool:
     return (a // 8) == (b // 8)
 
-def _valid_step(prev: int, curr: int, step: int) -> bool:
-    """Ensure moving from prev->curr by 'step' stays on the intended line without wrapping."""
-    if not isOnBoard(prev) or not isOnBoard(curr):
-        return False
-    dr = (curr // 8) - (prev // 8)
-    dc = (curr % 8) - (prev % 8)
-    if step == 1:   # right
-        return dr == 0 and dc == 1
-    if step == -1:  # left
-        return dr == 0 and dc == -1
-    if step == 8:   # down a row
-        return dr == 1 and dc == 0
-    if step == -8:  # up a row
-        return dr == -1 and dc == 0
-    if step == 9:   # down-right
-        return dr == 1 and dc == 1
-    if step == -9:  # up-left
-        return dr == -1 and dc == -1
-    if step == 7:   # down-left
-        return dr == 1 and dc == -1
-    if step == -7:  # up-right
-        return dr == -1 and dc == 1
-    return False
-
 def _path_clear(board, start, dest, step) -> bool:
-    i = start + step
-    while i != dest:
-        if not isOnBoard(i) or not _valid_step(i - step, i, step):
-            return False
+    for i in RAYS[step][start]:
+        if i == dest:
+            return True
         if board[i] is not None:
             return False
-        i += step
-    # Final continuity check into dest
-    return _valid_step(dest - step, dest, step)
+    return False
 
 def isEnemyPiece(board, position, pieceType, enemy_turn) -> bool:
     p = board[position]
@@ -92,66 +66,68 @@ def isKingSafe(board, turn: str, position: Optional[int] = None) -> bool:
     if king_pos == -1:
         return False
     enemy = 'player' if turn == 'bot' else 'bot'
-    # Pawn attacks
-    pawn_attacks = (-9, -7) if turn == 'bot' else (9, 7)
-    for off in pawn_attacks:
-        pos = king_pos + off
-        if isOnBoard(pos) and _valid_step(king_pos, pos, off) and isEnemyPiece(board, pos, 'p', enemy):
+    # Pawn attacks: enemy pawns sit where our own pawn would capture from the king square.
+    for pos in PAWN_ATTACKS[0 if turn == 'bot' else 1][king_pos]:
+        if isEnemyPiece(board, pos, 'p', enemy):
             return False
-    # Rook/Queen lines
-    for d in (1, -1, 8, -8):
-        i = king_pos + d
-        while isOnBoard(i) and _valid_step(i - d, i, d):
-            piece = board[i]
-            if piece:
-                if piece[0].lower() in ('r', 'q') and (piece.islower() if enemy == 'player' else piece.isupper()):
-                    return False
-                break
-            i += d
-    # Bishop/Queen diagonals
-    for d in (9, -9, 7, -7):
-        i = king_pos + d
-        while isOnBoard(i) and _valid_step(i - d, i, d):
-            piece = board[i]
-            if piece:
-                if piece[0].lower() in ('b', 'q') and (piece.islower() if enemy == 'player' else piece.isupper()):
-                    return False
-                break
-            i += d
+    # Rook/Queen lines, then Bishop/Queen diagonals
+    for rays, kinds in ((ROOK_RAYS[king_pos], ('r', 'q')), (BISHOP_RAYS[king_pos], ('b', 'q'))):
+        for ray in rays:
+            for i in ray:
+                piece = board[i]
+                if piece:
+                    if piece[0].lower() in kinds and (piece.islower() if enemy == 'player' else piece.isupper()):
+                        return False
+                    break
     # Knights
-    for off in _KNIGHT_OFFS:
-        i = king_pos + off
-        if isOnBoard(i) and isEnemyPiece(board, i, 'n', enemy):
-            rdiff = abs((i // 8) - (king_pos // 8))
-            cdiff = abs((i % 8) - (king_pos % 8))
-            if (rdiff, cdiff) in {(1, 2), (2, 1)}:
-                return False
+    for i in KNIGHT_TARGETS[king_pos]:
+        if isEnemyPiece(board, i, 'n', enemy):
+            return False
     # Opposing king adjacency
-    for off in (-1, 1, -8, 8, -9, -7, 9, 7):
-        i = king_pos + off
-        if isOnBoard(i) and _valid_step(king_pos, i, off) and isEnemyPiece(board, i, 'k', enemy):
+    for i in KING_TARGETS[king_pos]:
+        if isEnemyPiece(board, i, 'k', enemy):
             return False
     return True
 
-def _last_move(gameStates):
+def _ep_pawn(gameStates) -> Optional[int]:
+    """
+    Square of the pawn that just advanced two squares (capturable en passant), or None.
+    Derived once per call from the last two boards; move generation takes the result.
+    """
     if not gameStates or len(gameStates) < 2:
         return None
     prev = gameStates[-1]
     prev2 = gameStates[-2]
-    diffs = [i for i in range(64) if prev[i] != prev2[i]]
-    if not diffs:
+    from_idx = to_idx = None
+    for i in range(64):
+        if prev[i] != prev2[i]:
+            if prev2[i] and from_idx is None:
+                from_idx = i
+            if prev[i] and to_idx is None:
+                to_idx = i
+    if from_idx is None or to_idx is None or abs(to_idx - from_idx) != 16:
         return None
-    from_idx = next((i for i in diffs if prev2[i] and prev[i] != prev2[i]), None)
-    to_idx = next((i for i in diffs if prev[i] and prev[i] != prev2[i]), None)
-    if from_idx is None or to_idx is None:
+    if prev[to_idx][0].lower() != 'p':
         return None
-    return (prev[to_idx], from_idx, to_idx)
+    return to_idx
+
+def _is_ep_capture(ep: Optional[int], src: int, dest: int) -> bool:
+    """A diagonal pawn step from `src` to `dest` passes the double-pushed pawn at `ep`."""
+    return ep is not None and (ep // 8) == (src // 8) and (ep % 8) == (dest % 8)
 
 def moveValidate(piece: str, dest: int, turn: str, board, botWhite, gameStates) -> bool:
     if not ((piece[0].islower() and turn == 'player') or (piece[0].isupper() and turn == 'bot')): return False
     if not isOnBoard(dest): return False
     src = findPiece(piece, board)
     if src == -1: return False
+    ep = _ep_pawn(gameStates) if piece[0].lower() == 'p' else None
+    return _move_valid(piece, src, dest, turn, board, ep)
+
+def _move_valid(piece: str, src: int, dest: int, turn: str, board, ep: Optional[int]) -> bool:
+    """
+    moveValidate for a piece whose square `src` is already known (no findPiece scan).
+    `ep` is the en-passant pawn from _ep_pawn().
+    """
     if board[dest] is not None and same_side(piece, board[dest]): return False
     # Kings are not capturable; checkmate ends the game instead.
     if turn == 'player' and board[dest] == 'K': return False
@@ -163,23 +139,19 @@ def moveValidate(piece: str, dest: int, turn: str, board, botWhite, gameStates)
     if t == 'r':
         if rdiff != 0 and cdiff != 0: return False
         step = 8 if rdiff > 0 else (-8 if rdiff < 0 else (1 if cdiff > 0 else -1))
-        if not _valid_step(src, src + step, step): return False
         return _path_clear(board, src, dest, step)
 
     if t == 'b':
         if abs(rdiff) != abs(cdiff): return False
         step = 9 if (rdiff > 0 and cdiff > 0) else (-9 if (rdiff < 0 and cdiff < 0) else (7 if (rdiff > 0 and cdiff < 0) else -7))
-        if not _valid_step(src, src + step, step): return False
         return _path_clear(board, src, dest, step)
 
     if t == 'q':
         if rdiff == 0 or cdiff == 0:
             step = 8 if rdiff > 0 else (-8 if rdiff < 0 else (1 if cdiff > 0 else -1))
-            if not _valid_step(src, src + step, step): return False
             return _path_clear(board, src, dest, step)
         if abs(rdiff) == abs(cdiff):
             step = 9 if (rdiff > 0 and cdiff > 0) else (-9 if (rdiff < 0 and cdiff < 0) else (7 if (rdiff > 0 and cdiff < 0) else -7))
-            if not _valid_step(src, src + step, step): return False
             return _path_clear(board, src, dest, step)
         return False
 
@@ -199,89 +171,71 @@ def moveValidate(piece: str, dest: int, turn: str, board, botWhite, gameStates)
         # capture
         if rdiff == forward and abs(cdiff) == 1 and board[dest] is not None and not same_side(piece, board[dest]): return True
         # en passant capture
-        if rdiff == forward and abs(cdiff) == 1 and board[dest] is None:
-            last = _last_move(gameStates)
-            if last:
-                last_piece, from_idx, to_idx = last
-                if last_piece and last_piece[0].lower() == 'p' and abs(to_idx-from_idx) == 16:
-                    if (to_idx // 8) == (src // 8) and (to_idx % 8) == (dest % 8):
-                        return True
+        if rdiff == forward and abs(cdiff) == 1 and board[dest] is None and _is_ep_capture(ep, src, dest):
+            return True
         return False
 
     return False
 
-def getPieceMoves(piece, originalBoard, botWhite, gameStates):
+def getPieceMoves(piece, originalBoard, botWhite, gameStates, src: Optional[int] = None):
     if piece is None:
         return tuple()
-    src = findPiece(piece, originalBoard)
+    if src is None:
+        src = findPiece(piece, originalBoard)
     if src == -1:
         return tuple()
+    ep = _ep_pawn(gameStates) if piece[0].lower() == 'p' else None
+    return _piece_moves(piece, src, originalBoard, ep)
 
+def _piece_moves(piece, src: int, originalBoard, ep: Optional[int]):
+    """getPieceMoves with the square and en-passant pawn already resolved."""
     turn = 'player' if piece[0].islower() else 'bot'
     t = piece[0].lower()
     moves = []
-    last = _last_move(gameStates)
 
     def add_move(dest: int):
         if dest == src:
             return
-        if not moveValidate(piece, dest, turn, originalBoard, botWhite, gameStates):
+        if not isOnBoard(dest) or not _move_valid(piece, src, dest, turn, originalBoard, ep):
             return
         b = list(originalBoard)
         # handle en passant capture removal
-        if t == 'p' and b[dest] is None and (abs((dest % 8) - (src % 8)) == 1) and last:
-            _, _, to_idx = last
-            if (to_idx // 8) == (src // 8) and (to_idx % 8) == (dest % 8):
-                b[to_idx] = None
+        if t == 'p' and b[dest] is None and (abs((dest % 8) - (src % 8)) == 1) and _is_ep_capture(ep, src, dest):
+            b[ep] = None
         b[dest] = piece
         b[src] = None
         moves.append(tuple(b))
 
-    def ray(step: int):
-        i = src + step
-        while isOnBoard(i) and _valid_step(i - step, i, step):
-            if originalBoard[i] is None:
-                add_move(i)
-            else:
-                if not same_side(piece, originalBoard[i]):
+    def rays(table):
+        for ray in table[src]:
+            for i in ray:
+                if originalBoard[i] is None:
                     add_move(i)
-                break
-            i += step
+                else:
+                    if not same_side(piece, originalBoard[i]):
+                        add_move(i)
+                    break
 
     if t == 'r':
-        for step in (1, -1, 8, -8):
-            ray(step)
+        rays(ROOK_RAYS)
         return tuple(moves)
 
     if t == 'b':
-        for step in (7, -7, 9, -9):
-            ray(step)
+        rays(BISHOP_RAYS)
         return tuple(moves)
 
     if t == 'q':
-        for step in (1, -1, 8, -8, 7, -7, 9, -9):
-            ray(step)
+        rays(QUEEN_RAYS)
         return tuple(moves)
 
     if t == 'n':
-        sr, sc = src // 8, src % 8
-        for off in _KNIGHT_OFFS:
-            dest = src + off
-            if not isOnBoard(dest):
-                continue
-            dr = abs((dest // 8) - sr)
-            dc = abs((dest % 8) - sc)
-            if (dr, dc) not in {(1, 2), (2, 1)}:
-                continue
+        for dest in KNIGHT_TARGETS[src]:
             if originalBoard[dest] is None or not same_side(piece, originalBoard[dest]):
                 add_move(dest)
         return tuple(moves)
 
     if t == 'k':
-        for off in (-1, 1, -8, 8, -9, -7, 9, 7):
-            dest = src + off
-            if not isOnBoard(dest) or not _valid_step(src, dest, off):
-                continue
+        for dest in KING_TARGETS[src]:
             if originalBoard[dest] is None or not same_side(piece, originalBoard[dest]):
                 add_move(dest)
         return tuple(moves)
@@ -290,7 +244,7 @@ def getPieceMoves(piece, originalBoard, botWhite, gameStates):
         forward = 1 if turn == 'player' else -1
         start_row = 1 if turn == 'player' else 6
         one = src + 8 * forward
-        if isOnBoard(one) and _valid_step(src, one, 8 * forward) and originalBoard[one] is None:
+        if isOnBoard(one) and originalBoard[one] is None:
             add_move(one)
             two = src + 16 * forward
             if (src // 8) == start_row and isOnBoard(two) and originalBoard[two] is None:
@@ -298,21 +252,15 @@ def getPieceMoves(piece, originalBoard, botWhite, gameStates):
                 add_move(two)
 
         # captures and en passant
-        for step in (7 * forward, 9 * forward):
-            dest = src + step
-            if not isOnBoard(dest) or not _valid_step(src, dest, step):
-                continue
+        for dest in PAWN_ATTACKS[0 if turn == 'bot' else 1][src]:
             target = originalBoard[dest]
             if target is not None:
                 if not same_side(piece, target):
                     add_move(dest)
                 continue
             # potential en passant: diagonal into empty square
-            if last:
-                last_piece, from_idx, to_idx = last
-                if last_piece and last_piece[0].lower() == 'p' and abs(to_idx - from_idx) == 16:
-                    if not same_side(piece, last_piece) and (to_idx // 8) == (src // 8) and (to_idx % 8) == (dest % 8):
-                        add_move(dest)
+            if _is_ep_capture(ep, src, dest) and originalBoard[ep] and not same_side(piece, originalBoard[ep]):
+                add_move(dest)
         return tuple(moves)
 
     # Fallback (shouldn't happen)
@@ -322,14 +270,15 @@ def getPieceMoves(piece, originalBoard, botWhite, gameStates):
 
 def getAllTeamMoves(team, board, botWhite, gameStates):
     teamMoves = []
+    ep = _ep_pawn(gameStates)
     if team == 'player':
-        for p in board:
+        for i, p in enumerate(board):
             if p and p[0].islower():
-                teamMoves.append(getPieceMoves(p, board, botWhite, gameStates))
+                teamMoves.append(_piece_moves(p, i, board, ep))
     else:
-        for p in board:
+        for i, p in enumerate(board):
             if p and p[0].isupper():
-                teamMoves.append(getPieceMoves(p, board, botWhite, gameStates))
+                teamMoves.append(_piece_moves(p, i, board, ep))
     return tuple(teamMoves)
 
 def promotePawn(piece: str, dest: int, new_piece: str, board, turn: str):
@@ -352,11 +301,9 @@ def movePiece(piece, destIndex, board, gameStates, turn):
     b = list(board)
     # en passant removal if applicable
     if piece[0].lower() == 'p' and b[destIndex] is None and abs((destIndex%8)-(src%8)) == 1:
-        last = _last_move(gameStates)
-        if last:
-            last_piece, _, to_idx = last
-            if last_piece and last_piece[0].lower() == 'p' and (to_idx // 8) == (src // 8) and (to_idx % 8) == (destIndex % 8):
-                b[to_idx] = None
+        ep = _ep_pawn(gameStates)
+        if _is_ep_capture(ep, src, destIndex):
+            b[ep] = None
     b[destIndex] = piece
     b[src] = None
     return tuple(b)
@@ -409,20 +356,15 @@ def castleValidate(botWhite, turn, board):
     return True
 
 def detectCheckmate(board, turn, botWhite, gameStates):
-    team_moves = getAllTeamMoves(turn, board, botWhite, gameStates)
-    legal = [m for moves in team_moves for m in moves if isKingSafe(m, turn)]
-    if legal: return False
-    return not isKingSafe(board, turn)
+    return checkCheckmateOrStalemate(board, turn, botWhite, gameStates) == 'checkmate'
 
 def detectStalemate(board, turn, botWhite, gameStates):
-    team_moves = getAllTeamMoves(turn, board, botWhite, gameStates)
-    legal = [m for moves in team_moves for m in moves if isKingSafe(m, turn)]
-    return (not legal) and isKingSafe(board, turn)
+    return checkCheckmateOrStalemate(board, turn, botWhite, gameStates) == 'stalemate'
 
 def checkCheckmateOrStalemate(board, turn, botWhite, gameStates):
-    if detectCheckmate(board, turn, botWhite, gameStates): return 'checkmate'
-    if detectStalemate(board, turn, botWhite, gameStates): return 'stalemate'
-    return 'none'
+    pos = Position.from_board(board, turn, botWhite, gameStates)
+    if has_legal_move(pos): return 'none'
+    return 'checkmate' if in_check(pos) else 'stalemate'
 
 def inputValidate(inputString: str, board, botWhite, turn: str, gameStates):
     """
@@ -222,17 +222,19 @@ def play_game(
             )
             # Best-effort diagnosis (checkmate vs stalemate) using this repo's rules.
             try:
-                from gameLogic import checkCheckmateOrStalemate  # type: ignore
-                from uci import _parse_position, board_from_fen  # type: ignore
+                from position import has_legal_move, in_check  # type: ignore
+                from uci import START_FEN, _parse_position, board_from_fen  # type: ignore
 
                 if fen:
                     state = board_from_fen(fen)
                     toks = ["fen", *fen.split(), "moves", *moves]
                 else:
-                    state = board_from_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+                    state = board_from_fen(START_FEN)
                     toks = ["startpos", "moves", *moves]
                 state = _parse_position(toks, state)
-                terminal = checkCheckmateOrStalemate(state.board, state.turn, True, state.gameStates)
+                terminal = "none"
+                if not has_legal_move(state.pos):
+                    terminal = "checkmate" if in_check(state.pos) else "stalemate"
                 if terminal in ("checkmate", "stalemate"):
                     side = "White" if state.turn == "bot" else "Black"
                     print(f"Terminal diagnosed: {terminal} (side to move: {side}).", file=sys.stderr, flush=True)
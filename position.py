@@ -0,0 +1,901 @@
+# position.py
+"""
+Array-backed board representation for the search, perft and UCI layers.
+
+gameLogic works on 64-tuples of named pieces ('p3', 'R2', 'K', ...). Here every
+square holds a small integer code instead, so hot loops can read side and kind
+through table lookups rather than string methods. The original names ride along
+in a parallel list, which keeps conversion back to the tuple format lossless.
+
+Conventions match gameLogic: index 0 is the top-left square, "bot" pieces are
+uppercase and move towards row 0, "player" pieces are lowercase and move towards
+row 7. `bot_white` only changes where the kings (and so castling) start.
+"""
+from __future__ import annotations
+
+import random
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from attacks import BISHOP_RAYS, KING_TARGETS, KNIGHT_TARGETS, PAWN_ATTACKS, QUEEN_RAYS, ROOK_RAYS
+
+Board = Tuple[Optional[str], ...]
+
+# --- Piece codes ---
+BOT = 0     # uppercase pieces
+PLAYER = 1  # lowercase pieces
+
+EMPTY = 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = 1, 2, 3, 4, 5, 6
+
+# A code is the kind for bot pieces and kind | 8 for player pieces.
+KIND = tuple(c & 7 for c in range(16))
+SIDE = tuple(c >> 3 for c in range(16))
+
+_LETTERS = ".pnbrqk"
+CODE: Dict[str, int] = {}
+for _k in range(1, 7):
+    CODE[_LETTERS[_k].upper()] = _k
+    CODE[_LETTERS[_k]] = _k | 8
+
+TURN_SIDE = {"bot": BOT, "player": PLAYER}
+SIDE_TURN = ("bot", "player")
+
+# Pawn geometry per side.
+PAWN_PUSH = (-8, 8)
+PAWN_START_ROW = (6, 1)
+PAWN_PROMO_ROW = (0, 7)
+PROMO_KINDS = (QUEEN, ROOK, BISHOP, KNIGHT)
+
+# Move flags.
+CAPTURE = 1
+EN_PASSANT = 2
+CASTLE = 4
+PROMOTION = 8
+
+# --- Castling ---
+CASTLE_BOT_SHORT = 1
+CASTLE_BOT_LONG = 2
+CASTLE_PLAYER_SHORT = 4
+CASTLE_PLAYER_LONG = 8
+
+# (right, side, king_from, king_to, rook_from, rook_to, must_be_empty, king_path)
+_CastleRule = Tuple[int, int, int, int, int, int, Tuple[int, ...], Tuple[int, ...]]
+_CASTLE_RULES: Dict[bool, Tuple[_CastleRule, ...]] = {
+    True: (
+        (CASTLE_BOT_SHORT, BOT, 60, 62, 63, 61, (61, 62), (60, 61, 62)),
+        (CASTLE_BOT_LONG, BOT, 60, 58, 56, 59, (59, 58, 57), (60, 59, 58)),
+        (CASTLE_PLAYER_SHORT, PLAYER, 4, 6, 7, 5, (5, 6), (4, 5, 6)),
+        (CASTLE_PLAYER_LONG, PLAYER, 4, 2, 0, 3, (3, 2, 1), (4, 3, 2)),
+    ),
+    # Bot plays black from the bottom: files are mirrored, kings start on the d-file.
+    False: (
+        (CASTLE_BOT_SHORT, BOT, 59, 57, 56, 58, (58, 57), (59, 58, 57)),
+        (CASTLE_BOT_LONG, BOT, 59, 61, 63, 60, (60, 61, 62), (59, 60, 61)),
+        (CASTLE_PLAYER_SHORT, PLAYER, 3, 1, 0, 2, (2, 1), (3, 2, 1)),
+        (CASTLE_PLAYER_LONG, PLAYER, 3, 5, 7, 4, (4, 5, 6), (3, 4, 5)),
+    ),
+}
+
+def _castle_masks(bot_white: bool) -> Tuple[int, ...]:
+    """Rights that survive a move touching each square (king or rook leaving/captured)."""
+    masks = [15] * 64
+    for right, _, king_from, _, rook_from, _, _, _ in _CASTLE_RULES[bot_white]:
+        masks[king_from] &= ~right
+        masks[rook_from] &= ~right
+    return tuple(masks)
+
+_CASTLE_MASK = {True: _castle_masks(True), False: _castle_masks(False)}
+
+# gameLogic.newBoard names the corner rooks R1/R2 (r1/r2) in both orientations.
+_HOME_ROOK_NAMES = {56: "R1", 63: "R2", 0: "r1", 7: "r2"}
+
+_FEN_CASTLING = {"K": CASTLE_BOT_SHORT, "Q": CASTLE_BOT_LONG, "k": CASTLE_PLAYER_SHORT, "q": CASTLE_PLAYER_LONG}
+# gameLogic.castle and the web app only castle kingside; FEN positions get all four rights.
+CASTLE_TUPLE = CASTLE_BOT_SHORT | CASTLE_PLAYER_SHORT
+
+
+def castling_rights(board: Board, botWhite: bool) -> int:
+    """
+    Rights a tuple board can still support: king and original rook on their home squares.
+    Only the kingside rights (CASTLE_TUPLE), as gameLogic has no queenside castling.
+
+    This is an upper bound only; callers that follow a game should AND it into the rights
+    they carry so a king or rook that left and came back stays without the right.
+    """
+    rights = 0
+    for right, s, king_from, _, rook_from, _, _, _ in _CASTLE_RULES[bool(botWhite)]:
+        if not right & CASTLE_TUPLE:
+            continue
+        king = board[king_from]
+        if king and CODE[king[0]] == (KING | (s << 3)) and board[rook_from] == _HOME_ROOK_NAMES[rook_from]:
+            rights |= right
+    return rights
+
+
+# --- Zobrist keys ---
+# One key per (piece code, square), plus side to move, castling mask and ep file.
+# Names are deliberately not hashed: 'P3' and 'P4' on the same square are the same position.
+_Z_RNG = random.Random(0)
+_Z_PIECE = tuple(tuple(_Z_RNG.getrandbits(64) if KIND[c] else 0 for _ in range(64)) for c in range(16))
+_Z_SIDE = _Z_RNG.getrandbits(64)
+_Z_CASTLING = tuple(_Z_RNG.getrandbits(64) if r else 0 for r in range(16))
+_Z_EP = tuple(_Z_RNG.getrandbits(64) for _ in range(8))
+
+
+def zobrist(pos: "Position") -> int:
+    """Hash `pos` from scratch; make_move()/unmake_move() keep `pos.hash` equal to this."""
+    h = 0
+    for i, c in enumerate(pos.sq):
+        if c:
+            h ^= _Z_PIECE[c][i]
+    if pos.side == PLAYER:
+        h ^= _Z_SIDE
+    h ^= _Z_CASTLING[pos.castling]
+    if pos.ep is not None:
+        h ^= _Z_EP[pos.ep & 7]
+    return h
+
+
+def _named_piece(letter: str, counts: Dict[str, int]) -> str:
+    """
+    Convert a single-letter FEN piece to gameLogic's unique-name format.
+    Kings must be exactly K/k; the first queen is Q/q, everything else is numbered.
+    """
+    if letter in ("K", "k"):
+        return letter
+    counts[letter] = counts.get(letter, 0) + 1
+    n = counts[letter]
+    if letter.upper() == "Q" and n == 1:
+        return letter
+    return f"{letter}{n}"
+
+
+def _promotion_name(names: Sequence[Optional[str]], code: int) -> str:
+    """Name a freshly promoted piece the same way gameLogic.promotePawn does."""
+    base = _LETTERS[KIND[code]]
+    count = 1
+    for existing in names:
+        if existing and existing[0].lower() == base:
+            suffix = int(existing[1:]) if len(existing) > 1 and existing[1:].isdigit() else 1
+            count = max(count, suffix + 1)
+    name = base + str(count)
+    return name.upper() if SIDE[code] == BOT else name
+
+
+def _ep_from_history(gameStates, side: int) -> Optional[int]:
+    """En-passant target implied by the last two boards, if the opponent just double-pushed."""
+    if not gameStates or len(gameStates) < 2:
+        return None
+    prev2, prev = gameStates[-2], gameStates[-1]
+    from_idx = to_idx = None
+    for i in range(64):
+        if prev[i] != prev2[i]:
+            if prev2[i] and prev[i] is None:
+                from_idx = i
+            elif prev[i]:
+                to_idx = i
+    if from_idx is None or to_idx is None or abs(to_idx - from_idx) != 16:
+        return None
+    mover = prev[to_idx]
+    code = CODE.get(mover[0], EMPTY)
+    if KIND[code] != PAWN or SIDE[code] == side:
+        return None
+    return (from_idx + to_idx) // 2
+
+
+class Position:
+    """
+    Mutable board: `sq` holds piece codes, `names` the matching gameLogic names.
+
+    `side` is the side to move, `castling` a bitmask of CASTLE_* rights, `ep` the
+    en-passant target square (or None) and `halfmove` the plies since the last pawn
+    move or capture. `hash` is the Zobrist key of all of the above except the clock.
+
+    An evaluator can attach_psq() a per-code, per-square integer table; `psq_sum`
+    then holds its total over the occupied squares and make/unmake keep it current.
+    `pieces[side]` maps each piece name to its square and `kings[side]` is that
+    side's king square (-1 if absent); both are kept in step with every move so
+    lookups never scan the board.
+
+    The search mutates one Position with make_move()/unmake_move(); everything
+    unmake_move() cannot recompute from the Move is kept on an undo stack.
+    """
+
+    __slots__ = ("sq", "names", "side", "bot_white", "castling", "ep", "halfmove", "hash", "psq", "psq_sum", "pieces", "kings", "_undo")
+
+    def __init__(
+        self,
+        sq: List[int],
+        names: List[Optional[str]],
+        side: int,
+        bot_white: bool = True,
+        castling: int = 0,
+        ep: Optional[int] = None,
+        halfmove: int = 0,
+    ):
+        self.sq = sq
+        self.names = names
+        self.side = side
+        self.bot_white = bot_white
+        self.castling = castling
+        self.ep = ep
+        self.halfmove = halfmove
+        self.pieces: Tuple[Dict[str, int], Dict[str, int]] = ({}, {})
+        self.kings = [-1, -1]
+        self._undo: List[tuple] = []
+        for i, c in enumerate(sq):
+            if c:
+                self.pieces[SIDE[c]][names[i]] = i
+                if KIND[c] == KING:
+                    self.kings[SIDE[c]] = i
+        self.hash = zobrist(self)
+        self.psq: Optional[Sequence[Sequence[int]]] = None
+        self.psq_sum = 0
+
+    @classmethod
+    def from_board(
+        cls,
+        board: Board,
+        turn: str,
+        botWhite: bool,
+        gameStates=None,
+        castling: Optional[int] = None,
+        halfmove: int = 0,
+    ) -> "Position":
+        """
+        Build a position from a gameLogic tuple board.
+
+        The tuple format carries no history, so callers that track castling rights
+        across the game pass them in; otherwise they are inferred from placement the
+        way castleValidate does. The en-passant square comes from the last two boards.
+        """
+        names = list(board)
+        sq = [CODE[p[0]] if p else EMPTY for p in names]
+        side = TURN_SIDE[turn]
+        rights = castling_rights(board, botWhite)
+        if castling is not None:
+            rights &= castling
+        return cls(sq, names, side, bool(botWhite), rights, _ep_from_history(gameStates, side), halfmove)
+
+    @classmethod
+    def from_fen(cls, fen: str) -> "Position":
+        """Standard orientation (white = bot) position from FEN; pieces get unique names."""
+        parts = fen.strip().split()
+        if len(parts) < 2:
+            raise ValueError("FEN must include board and side-to-move")
+        rows = parts[0].split("/")
+        if len(rows) != 8:
+            raise ValueError("FEN board must have 8 ranks")
+
+        counts: Dict[str, int] = {}
+        names: List[Optional[str]] = []
+        for r in rows:
+            for ch in r:
+                if ch.isdigit():
+                    names.extend([None] * int(ch))
+                else:
+                    names.append(_named_piece(ch, counts))
+        if len(names) != 64:
+            raise ValueError(f"FEN expanded to {len(names)} squares, expected 64")
+
+        sq = [CODE[p[0]] if p else EMPTY for p in names]
+        side = BOT if parts[1] == "w" else PLAYER
+        castling = 0
+        if len(parts) > 2 and parts[2] != "-":
+            for ch in parts[2]:
+                castling |= _FEN_CASTLING.get(ch, 0)
+        ep = None
+        if len(parts) > 3 and parts[3] != "-" and len(parts[3]) == 2:
+            file = ord(parts[3][0].lower()) - ord("a")
+            rank = int(parts[3][1]) - 1
+            ep = (7 - rank) * 8 + file
+        halfmove = int(parts[4]) if len(parts) > 4 and parts[4].isdigit() else 0
+        return cls(sq, names, side, True, castling, ep, halfmove)
+
+    def to_board(self) -> Board:
+        return tuple(self.names)
+
+    @property
+    def turn(self) -> str:
+        return SIDE_TURN[self.side]
+
+    def copy(self) -> "Position":
+        c = Position.__new__(Position)
+        c.sq = self.sq[:]
+        c.names = self.names[:]
+        c.side = self.side
+        c.bot_white = self.bot_white
+        c.castling = self.castling
+        c.ep = self.ep
+        c.halfmove = self.halfmove
+        c.hash = self.hash
+        c.psq = self.psq
+        c.psq_sum = self.psq_sum
+        c.pieces = (self.pieces[0].copy(), self.pieces[1].copy())
+        c.kings = self.kings[:]
+        c._undo = self._undo[:]
+        return c
+
+    @property
+    def last_move(self) -> Optional[Move]:
+        """The move that reached this position, if it was played with make_move() (None after a null move)."""
+        return self._undo[-1][0] if self._undo else None
+
+    def attach_psq(self, psq: Sequence[Sequence[int]]) -> None:
+        """Track sum(psq[code][square]) incrementally from now on."""
+        self.psq = psq
+        self.psq_sum = sum(psq[c][i] for i, c in enumerate(self.sq) if c)
+
+    def psq_delta(self, m: Move) -> int:
+        """Change in psq_sum that playing `m` would cause (requires attach_psq)."""
+        psq = self.psq
+        d = psq[m.promo or m.moved][m.to] - psq[m.moved][m.frm]
+        if m.captured:
+            cap = m.to - PAWN_PUSH[self.side] if m.flags & EN_PASSANT else m.to
+            d -= psq[m.captured][cap]
+        if m.flags & CASTLE:
+            rook_from, rook_to = _CASTLE_ROOK[(self.bot_white, m.to)]
+            rook = self.sq[rook_from]
+            d += psq[rook][rook_to] - psq[rook][rook_from]
+        return d
+
+    def make_move(self, m: Move) -> None:
+        """Play pseudo-legal `m` in place; undo it with unmake_move()."""
+        sq, names = self.sq, self.names
+        side = self.side
+        own, enemy = self.pieces[side], self.pieces[side ^ 1]
+        frm, to = m.frm, m.to
+        name = names[frm]
+        cap_name = None
+        psq_sum = self.psq_sum
+        if self.psq is not None:
+            self.psq_sum += self.psq_delta(m)
+        h = self.hash ^ _Z_PIECE[m.moved][frm] ^ _Z_PIECE[m.promo or m.moved][to] ^ _Z_SIDE
+        if m.captured:
+            cap = to - PAWN_PUSH[side] if m.flags & EN_PASSANT else to
+            h ^= _Z_PIECE[m.captured][cap]
+            cap_name = names[cap]
+            del enemy[cap_name]
+            sq[cap] = EMPTY
+            names[cap] = None
+        sq[to] = m.moved
+        names[to] = name
+        sq[frm] = EMPTY
+        names[frm] = None
+        own[name] = to
+        promo_name = None
+        if m.promo:
+            del own[name]
+            promo_name = _promotion_name(names, m.promo)
+            sq[to] = m.promo
+            names[to] = promo_name
+            own[promo_name] = to
+        if KIND[m.moved] == KING:
+            self.kings[side] = to
+        if m.flags & CASTLE:
+            rook_from, rook_to = _CASTLE_ROOK[(self.bot_white, to)]
+            rook = names[rook_from]
+            h ^= _Z_PIECE[sq[rook_from]][rook_from] ^ _Z_PIECE[sq[rook_from]][rook_to]
+            sq[rook_to], sq[rook_from] = sq[rook_from], EMPTY
+            names[rook_to], names[rook_from] = rook, None
+            own[rook] = rook_to
+        self._undo.append((m, name, cap_name, promo_name, self.castling, self.ep, self.halfmove, self.hash, psq_sum))
+        masks = _CASTLE_MASK[self.bot_white]
+        castling = self.castling & masks[frm] & masks[to]
+        if castling != self.castling:
+            h ^= _Z_CASTLING[self.castling] ^ _Z_CASTLING[castling]
+            self.castling = castling
+        if self.ep is not None:
+            h ^= _Z_EP[self.ep & 7]
+        if KIND[m.moved] == PAWN:
+            self.ep = (frm + to) // 2 if abs(to - frm) == 16 else None
+            self.halfmove = 0
+        else:
+            self.ep = None
+            self.halfmove = 0 if m.captured else self.halfmove + 1
+        if self.ep is not None:
+            h ^= _Z_EP[self.ep & 7]
+        self.hash = h
+        self.side = side ^ 1
+
+    def make_null_move(self) -> None:
+        """Pass the turn without moving (for null-move pruning); undo with unmake_null_move()."""
+        self._undo.append((None, None, None, None, self.castling, self.ep, self.halfmove, self.hash, self.psq_sum))
+        h = self.hash ^ _Z_SIDE
+        if self.ep is not None:
+            h ^= _Z_EP[self.ep & 7]
+            self.ep = None
+        self.hash = h
+        self.halfmove += 1
+        self.side ^= 1
+
+    def unmake_null_move(self) -> None:
+        _, _, _, _, self.castling, self.ep, self.halfmove, self.hash, self.psq_sum = self._undo.pop()
+        self.side ^= 1
+
+    def unmake_move(self) -> Move:
+        """Take back the last make_move() and return the move that was undone."""
+        m, name, cap_name, promo_name, self.castling, self.ep, self.halfmove, self.hash, self.psq_sum = self._undo.pop()
+        self.side ^= 1
+        sq, names = self.sq, self.names
+        side = self.side
+        own = self.pieces[side]
+        frm, to = m.frm, m.to
+        if m.flags & CASTLE:
+            rook_from, rook_to = _CASTLE_ROOK[(self.bot_white, to)]
+            rook = names[rook_to]
+            sq[rook_from], sq[rook_to] = sq[rook_to], EMPTY
+            names[rook_from], names[rook_to] = rook, None
+            own[rook] = rook_from
+        if promo_name is not None:
+            del own[promo_name]
+        sq[frm] = m.moved
+        names[frm] = name
+        own[name] = frm
+        sq[to] = EMPTY
+        names[to] = None
+        if m.captured:
+            cap = to - PAWN_PUSH[side] if m.flags & EN_PASSANT else to
+            sq[cap] = m.captured
+            names[cap] = cap_name
+            self.pieces[side ^ 1][cap_name] = cap
+        if KIND[m.moved] == KING:
+            self.kings[side] = frm
+        return m
+
+
+# --- Attack detection ---
+
+def is_attacked(pos: Position, target: int, by: int) -> bool:
+    """True if any piece of side `by` attacks square `target`."""
+    sq = pos.sq
+    base = by << 3
+    # Attacking pawns sit where a pawn of the other side would capture from `target`.
+    pawn = PAWN | base
+    for i in PAWN_ATTACKS[by ^ 1][target]:
+        if sq[i] == pawn:
+            return True
+    knight = KNIGHT | base
+    for i in KNIGHT_TARGETS[target]:
+        if sq[i] == knight:
+            return True
+    king = KING | base
+    for i in KING_TARGETS[target]:
+        if sq[i] == king:
+            return True
+    queen = QUEEN | base
+    for rays, slider in ((ROOK_RAYS[target], ROOK | base), (BISHOP_RAYS[target], BISHOP | base)):
+        for ray in rays:
+            for i in ray:
+                c = sq[i]
+                if c:
+                    if c == slider or c == queen:
+                        return True
+                    break
+    return False
+
+
+def king_safe(pos: Position, side: int) -> bool:
+    k = pos.kings[side]
+    if k == -1:
+        return False
+    return not is_attacked(pos, k, side ^ 1)
+
+
+def in_check(pos: Position) -> bool:
+    return not king_safe(pos, pos.side)
+
+
+# --- Move generation ---
+
+class Move(NamedTuple):
+    """
+    Compact move: squares, the moving and captured piece codes, the promotion
+    code (EMPTY if none) and CAPTURE/EN_PASSANT/CASTLE/PROMOTION flags.
+    """
+    frm: int
+    to: int
+    moved: int
+    captured: int = EMPTY
+    promo: int = EMPTY
+    flags: int = 0
+
+
+# (bot_white, king_to) -> (rook_from, rook_to) for castling moves.
+_CASTLE_ROOK: Dict[Tuple[bool, int], Tuple[int, int]] = {
+    (bw, rule[3]): (rule[4], rule[5]) for bw, rules in _CASTLE_RULES.items() for rule in rules
+}
+
+
+def castle_rook(pos: Position, m: Move) -> Tuple[int, int]:
+    """(rook_from, rook_to) for a castling move."""
+    return _CASTLE_ROOK[(pos.bot_white, m.to)]
+
+
+def captured_square(pos: Position, m: Move) -> int:
+    return m.to - PAWN_PUSH[pos.side] if m.flags & EN_PASSANT else m.to
+
+
+def pseudo_moves(pos: Position, attacked: Optional[bytearray] = None, noisy: Optional[bool] = None) -> Iterator[Move]:
+    """
+    Every pseudo-legal move; the mover's king may be left in check.
+    `attacked` (an attack_map of the opponent) replaces per-square attack tests on castling paths.
+    `noisy` restricts the output to captures and promotions (True) or to the other moves (False).
+    """
+    sq = pos.sq
+    side = pos.side
+    base = side << 3
+    quiet = noisy is not True
+    loud = noisy is not False
+    for src in pos.pieces[side].values():
+        code = sq[src]
+        kind = KIND[code]
+        if kind == PAWN:
+            push = PAWN_PUSH[side]
+            one = src + push
+            last_row = (one >> 3) == PAWN_PROMO_ROW[side]
+            if 0 <= one < 64 and not sq[one]:
+                if last_row:
+                    if loud:
+                        for k in PROMO_KINDS:
+                            yield Move(src, one, code, EMPTY, k | base, PROMOTION)
+                elif quiet:
+                    yield Move(src, one, code)
+                    two = one + push
+                    if (src >> 3) == PAWN_START_ROW[side] and not sq[two]:
+                        yield Move(src, two, code)
+            if not loud:
+                continue
+            for dest in PAWN_ATTACKS[side][src]:
+                target = sq[dest]
+                if target and SIDE[target] != side:
+                    if last_row:
+                        for k in PROMO_KINDS:
+                            yield Move(src, dest, code, target, k | base, CAPTURE | PROMOTION)
+                    else:
+                        yield Move(src, dest, code, target, EMPTY, CAPTURE)
+                elif dest == pos.ep and sq[dest - push] == PAWN | (base ^ 8):
+                    yield Move(src, dest, code, PAWN | (base ^ 8), EMPTY, CAPTURE | EN_PASSANT)
+        elif kind == KNIGHT or kind == KING:
+            for dest in (KNIGHT_TARGETS if kind == KNIGHT else KING_TARGETS)[src]:
+                target = sq[dest]
+                if not target:
+                    if quiet:
+                        yield Move(src, dest, code)
+                elif loud and SIDE[target] != side:
+                    yield Move(src, dest, code, target, EMPTY, CAPTURE)
+            if kind == KING and quiet and pos.castling:
+                for right, s, king_from, king_to, rook_from, _, empty, path in _CASTLE_RULES[pos.bot_white]:
+                    if s != side or src != king_from or not (pos.castling & right):
+                        continue
+                    if sq[rook_from] != ROOK | base or any(sq[i] for i in empty):
+                        continue
+                    if attacked is not None:
+                        if any(attacked[i] for i in path):
+                            continue
+                    elif any(is_attacked(pos, i, side ^ 1) for i in path):
+                        continue
+                    yield Move(king_from, king_to, code, EMPTY, EMPTY, CASTLE)
+        else:
+            table = ROOK_RAYS if kind == ROOK else BISHOP_RAYS if kind == BISHOP else QUEEN_RAYS
+            for ray in table[src]:
+                for i in ray:
+                    target = sq[i]
+                    if not target:
+                        if quiet:
+                            yield Move(src, i, code)
+                    else:
+                        if loud and SIDE[target] != side:
+                            yield Move(src, i, code, target, EMPTY, CAPTURE)
+                        break
+
+
+def is_legal(pos: Position, m: Move) -> bool:
+    """
+    Whether pseudo-legal `m` keeps the mover's king safe. Only the affected squares
+    are touched, and they are restored before returning.
+    """
+    sq = pos.sq
+    side = pos.side
+    frm, to = m.frm, m.to
+    ep = m.flags & EN_PASSANT
+    if ep:
+        sq[to - PAWN_PUSH[side]] = EMPTY
+    old_to = sq[to]
+    sq[to] = m.moved
+    sq[frm] = EMPTY
+    king = to if KIND[m.moved] == KING else pos.kings[side]
+    safe = king != -1 and not is_attacked(pos, king, side ^ 1)
+    sq[frm] = m.moved
+    sq[to] = old_to
+    if ep:
+        sq[to - PAWN_PUSH[side]] = m.captured
+    return safe
+
+
+def is_pseudo_legal(pos: Position, m: Move) -> bool:
+    """
+    Whether `m`, typically remembered from another position (TT move, killer), is a
+    pseudo-legal move here. Castling is checked in full, so a True castle is legal;
+    anything else still needs is_legal().
+    """
+    sq = pos.sq
+    side = pos.side
+    frm, to, code = m.frm, m.to, m.moved
+    if sq[frm] != code or SIDE[code] != side:
+        return False
+    if m.flags & EN_PASSANT:
+        return (to == pos.ep and not sq[to] and sq[to - PAWN_PUSH[side]] == m.captured
+                and to in PAWN_ATTACKS[side][frm])
+    if sq[to] != m.captured or (m.captured and SIDE[m.captured] == side):
+        return False
+    kind = KIND[code]
+    if m.flags & CASTLE:
+        if pos.kings[side] != frm:
+            return False
+        for right, s, king_from, king_to, rook_from, _, empty, path in _CASTLE_RULES[pos.bot_white]:
+            if s == side and king_from == frm and king_to == to:
+                return bool(pos.castling & right) and sq[rook_from] == ROOK | (side << 3) \
+                    and not any(sq[i] for i in empty) \
+                    and not any(is_attacked(pos, i, side ^ 1) for i in path)
+        return False
+    if kind == PAWN:
+        if bool(m.promo) != ((to >> 3) == PAWN_PROMO_ROW[side]):
+            return False
+        if m.captured:
+            return to in PAWN_ATTACKS[side][frm]
+        push = PAWN_PUSH[side]
+        if to == frm + push:
+            return True
+        return to == frm + 2 * push and (frm >> 3) == PAWN_START_ROW[side] and not sq[frm + push]
+    if m.promo:
+        return False
+    if kind == KNIGHT:
+        return to in KNIGHT_TARGETS[frm]
+    if kind == KING:
+        return to in KING_TARGETS[frm]
+    for ray in (ROOK_RAYS if kind == ROOK else BISHOP_RAYS if kind == BISHOP else QUEEN_RAYS)[frm]:
+        for i in ray:
+            if i == to:
+                return True
+            if sq[i]:
+                break
+    return False
+
+
+def attack_map(pos: Position, by: int) -> bytearray:
+    """attack_map(pos, by)[i] is 1 when a piece of side `by` attacks square i."""
+    sq = pos.sq
+    out = bytearray(64)
+    for src in pos.pieces[by].values():
+        kind = KIND[sq[src]]
+        if kind == PAWN:
+            for i in PAWN_ATTACKS[by][src]:
+                out[i] = 1
+        elif kind == KNIGHT or kind == KING:
+            for i in (KNIGHT_TARGETS if kind == KNIGHT else KING_TARGETS)[src]:
+                out[i] = 1
+        else:
+            for ray in (ROOK_RAYS if kind == ROOK else BISHOP_RAYS if kind == BISHOP else QUEEN_RAYS)[src]:
+                for i in ray:
+                    out[i] = 1
+                    if sq[i]:
+                        break
+    return out
+
+
+def checks_and_pins(pos: Position, side: int) -> Tuple[List[int], Set[int], Dict[int, Set[int]]]:
+    """
+    For `side`'s king: the squares of pieces giving check, the squares a non-king move
+    may land on to answer a single check (capture or block), and a map from each pinned
+    piece's square to the line it may move along (up to and including the pinner).
+    """
+    sq = pos.sq
+    king = pos.kings[side]
+    enemy = side ^ 1
+    ebase = enemy << 3
+    checkers: List[int] = []
+    block: Set[int] = set()
+    pins: Dict[int, Set[int]] = {}
+    for i in PAWN_ATTACKS[side][king]:
+        if sq[i] == PAWN | ebase:
+            checkers.append(i)
+            block.add(i)
+    for i in KNIGHT_TARGETS[king]:
+        if sq[i] == KNIGHT | ebase:
+            checkers.append(i)
+            block.add(i)
+    for rays, slider in ((ROOK_RAYS[king], ROOK), (BISHOP_RAYS[king], BISHOP)):
+        for ray in rays:
+            shield = -1
+            for n, i in enumerate(ray):
+                c = sq[i]
+                if not c:
+                    continue
+                if SIDE[c] == side:
+                    if shield != -1:
+                        break
+                    shield = i
+                    continue
+                if KIND[c] == slider or KIND[c] == QUEEN:
+                    line = set(ray[:n + 1])
+                    if shield == -1:
+                        checkers.append(i)
+                        block |= line
+                    else:
+                        pins[shield] = line
+                break
+    return checkers, block, pins
+
+
+def legal_moves(pos: Position, noisy: Optional[bool] = None) -> Iterator[Move]:
+    """
+    Strictly legal moves (only captures/promotions, or only the rest, when `noisy`
+    is given). Checkers and pins are found once per position, so apart from en
+    passant no move needs its own attack scan: king steps are tested against an
+    attack map built with the king lifted off the board, other pieces against the
+    check-evasion and pin-line masks.
+    """
+    side = pos.side
+    king = pos.kings[side]
+    if king == -1:
+        return
+    checkers, block, pins = checks_and_pins(pos, side)
+    sq = pos.sq
+    king_code = sq[king]
+    sq[king] = EMPTY
+    attacked = attack_map(pos, side ^ 1)
+    sq[king] = king_code
+    double_check = len(checkers) > 1
+    for m in pseudo_moves(pos, attacked, noisy):
+        if m.frm == king:
+            if m.flags & CASTLE:
+                if not checkers:
+                    yield m
+            elif not attacked[m.to]:
+                yield m
+            continue
+        if double_check:
+            continue
+        if m.flags & EN_PASSANT:
+            # The captured pawn leaves too, which can expose the king along its rank.
+            if is_legal(pos, m):
+                yield m
+            continue
+        if checkers and m.to not in block:
+            continue
+        line = pins.get(m.frm)
+        if line is not None and m.to not in line:
+            continue
+        yield m
+
+
+def has_legal_move(pos: Position, side: Optional[int] = None) -> bool:
+    """Whether `side` (default: the side to move) has any legal move; stops at the first one."""
+    if side is None or side == pos.side:
+        return next(legal_moves(pos), None) is not None
+    # Asking about the side not on move: its en-passant chance (if any) has already lapsed.
+    saved = (pos.side, pos.ep)
+    pos.side, pos.ep = side, None
+    try:
+        return next(legal_moves(pos), None) is not None
+    finally:
+        pos.side, pos.ep = saved
+
+
+def gives_check(pos: Position, m: Move) -> bool:
+    """Whether `m` attacks the opponent's king (discovered checks included)."""
+    opp_king = pos.kings[pos.side ^ 1]
+    if opp_king == -1:
+        return False
+    sq = pos.sq
+    frm, to = m.frm, m.to
+    saved = (sq[frm], sq[to])
+    cap = captured_square(pos, m)
+    saved_cap = sq[cap]
+    sq[cap] = EMPTY
+    sq[to] = m.promo or m.moved
+    sq[frm] = EMPTY
+    rook = castle_rook(pos, m) if m.flags & CASTLE else None
+    if rook is not None:
+        sq[rook[1]], sq[rook[0]] = sq[rook[0]], EMPTY
+    check = is_attacked(pos, opp_king, pos.side)
+    if rook is not None:
+        sq[rook[0]], sq[rook[1]] = sq[rook[1]], EMPTY
+    sq[cap] = saved_cap
+    sq[frm], sq[to] = saved
+    return check
+
+
+# --- Static exchange evaluation ---
+
+# Centipawn values by kind for exchange arithmetic (the king only ever captures last).
+SEE_VALUE = (0, 100, 320, 330, 500, 900, 20000)
+
+
+def mvv_lva(m: Move) -> int:
+    """Most valuable victim first, then least valuable attacker (higher sorts first)."""
+    return (KIND[m.captured] + KIND[m.promo]) * 8 - KIND[m.moved]
+
+
+def _least_attacker(sq: List[int], target: int, by: int, gone: Set[int]) -> int:
+    """Square of side `by`'s cheapest piece attacking `target`, ignoring `gone` squares; -1 if none."""
+    base = by << 3
+    pawn = PAWN | base
+    for i in PAWN_ATTACKS[by ^ 1][target]:
+        if sq[i] == pawn and i not in gone:
+            return i
+    knight = KNIGHT | base
+    for i in KNIGHT_TARGETS[target]:
+        if sq[i] == knight and i not in gone:
+            return i
+    # Sliders: the first piece on each ray, looking through squares already exchanged off.
+    best, best_kind = -1, KING
+    queen = QUEEN | base
+    for rays, slider in ((BISHOP_RAYS[target], BISHOP | base), (ROOK_RAYS[target], ROOK | base)):
+        for ray in rays:
+            for i in ray:
+                c = sq[i]
+                if not c or i in gone:
+                    continue
+                if (c == slider or c == queen) and KIND[c] < best_kind:
+                    best, best_kind = i, KIND[c]
+                break
+    if best >= 0:
+        return best
+    king = KING | base
+    for i in KING_TARGETS[target]:
+        if sq[i] == king and i not in gone:
+            return i
+    return -1
+
+
+def see(pos: Position, m: Move) -> int:
+    """
+    Static exchange evaluation of `m` in centipawns: what the mover nets if both
+    sides keep recapturing on m.to with their cheapest attacker, each free to stop.
+    Pins and checks are ignored, as usual for SEE.
+    """
+    sq = pos.sq
+    to = m.to
+    gone = {m.frm}
+    if m.flags & EN_PASSANT:
+        gone.add(captured_square(pos, m))
+    gain = [SEE_VALUE[KIND[m.captured]] + (SEE_VALUE[KIND[m.promo]] - SEE_VALUE[PAWN] if m.promo else 0)]
+    on_square = SEE_VALUE[KIND[m.promo or m.moved]]
+    side = pos.side ^ 1
+    while True:
+        i = _least_attacker(sq, to, side, gone)
+        if i < 0:
+            break
+        gain.append(on_square - gain[-1])
+        on_square = SEE_VALUE[KIND[sq[i]]]
+        gone.add(i)
+        side ^= 1
+    while len(gain) > 1:
+        g = gain.pop()
+        gain[-1] = -max(-gain[-1], g)
+    return gain[0]
+
+
+def apply(pos: Position, m: Move) -> Position:
+    """Return the position after `m`; `pos` itself is left untouched."""
+    c = pos.copy()
+    c.make_move(m)
+    return c
+
+
+def move_to_uci(m: Move) -> str:
+    s = "abcdefgh"[m.frm & 7] + str(8 - (m.frm >> 3)) + "abcdefgh"[m.to & 7] + str(8 - (m.to >> 3))
+    if m.promo:
+        s += _LETTERS[KIND[m.promo]]
+    return s
+
+
+def pack_move(m: Move) -> int:
+    """Move as a 28-bit int (0 is never a move: frm == to cannot happen)."""
+    return m.frm | (m.to << 6) | (m.moved << 12) | (m.captured << 16) | (m.promo << 20) | (m.flags << 24)
+
+
+def unpack_move(v: int) -> Move:
+    return Move(v & 63, (v >> 6) & 63, (v >> 12) & 15, (v >> 16) & 15, (v >> 20) & 15, (v >> 24) & 15)
@@ -1,12 +1,23 @@
 from __future__ import annotations
 
 import sys
+import threading
 import time
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
-
-from bot import botMove
-from gameLogic import findSquare, isKingSafe, movePiece, moveValidate, promotePawn
+from typing import List, Optional, Tuple
+
+from bot import (
+    TT_DEFAULT_MB,
+    IterationInfo,
+    SearchCaches,
+    TranspositionTable,
+    mate_distance,
+    new_transposition_table,
+    search_position,
+    split_root_search,
+)
+from gameLogic import findSquare
+from position import Move, Position, apply, is_legal, is_pseudo_legal, legal_moves, move_to_uci
 
 
 # UCI wrapper assumptions:
@@ -14,8 +25,12 @@ from gameLogic import findSquare, isKingSafe, movePiece, moveValidate, promotePa
 # - In this project, "bot" == uppercase pieces. We'll map:
 #     - White-to-move => turn="bot"
 #     - Black-to-move => turn="player"
-# - `botWhite=True` matches the standard king/queen placement in gameLogic.newBoard(True).
-BOT_WHITE = True
+# - Positions are built with `bot_white=True`, matching the standard king/queen placement in
+#   gameLogic.newBoard(True).
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+MAX_THREADS = 64
+MAX_DEPTH = 64  # `go infinite` / `go ponder` without a depth limit deepen until stopped
+STOP_WAIT_S = 2.0  # how long a new command waits for the stopped search to wind down
 
 
 Board = Tuple[Optional[str], ...]
@@ -23,265 +38,233 @@ Board = Tuple[Optional[str], ...]
 
 @dataclass
 class EngineState:
-    board: Board
-    gameStates: List[Board]
-    turn: str  # "bot" for white, "player" for black
-
+    pos: Position
+    # The `position` command this was built from: "startpos" or "fen <fen>", and the
+    # moves given after it, so the next command can play only what was added.
+    origin: Optional[str] = None
+    moves: Tuple[str, ...] = ()
 
-def _turn_from_fen(stm: str) -> str:
-    return "bot" if stm == "w" else "player"
+    @property
+    def board(self) -> Board:
+        return self.pos.to_board()
 
-def _opponent(turn: str) -> str:
-    return "player" if turn == "bot" else "bot"
+    @property
+    def turn(self) -> str:
+        return self.pos.turn  # "bot" for white, "player" for black
 
 
-def _fresh_piece_names() -> Dict[str, int]:
-    return {k: 0 for k in ["P", "N", "B", "R", "Q", "p", "n", "b", "r", "q"]}
+def board_from_fen(fen: str) -> EngineState:
+    return EngineState(pos=Position.from_fen(fen))
 
 
-def _named_piece(letter: str, counts: Dict[str, int]) -> str:
-    """
-    Convert a single-letter FEN piece to this engine's unique-name format.
-    Kings must be exactly K/k for isKingSafe() and other logic.
-    """
-    if letter in ("K", "k"):
-        return letter
-    counts[letter] = counts.get(letter, 0) + 1
-    n = counts[letter]
+def _apply_uci_move(state: EngineState, uci: str) -> EngineState:
+    uci = uci.strip()
+    if len(uci) < 4:
+        return state
+    frm = findSquare(uci[0:2])
+    to = findSquare(uci[2:4])
+    if frm is False or to is False:
+        return state
+    promo_letter = uci[4:5].lower() if len(uci) >= 5 else "q"
 
-    # Prefer traditional labels for first pieces (R1/R2 etc.).
-    base = letter
-    if base.upper() == "Q" and n == 1:
-        return "Q" if letter.isupper() else "q"
-    return f"{base}{n}"
+    pos = state.pos
+    for m in legal_moves(pos):
+        if m.frm != frm or m.to != to:
+            continue
+        if m.promo and move_to_uci(m)[4:] != promo_letter:
+            continue
+        return EngineState(pos=apply(pos, m))
+    return state
 
 
-def board_from_fen(fen: str) -> EngineState:
-    parts = fen.strip().split()
-    if len(parts) < 2:
-        raise ValueError("FEN must include board and side-to-move")
-    board_part, stm = parts[0], parts[1]
-    rows = board_part.split("/")
-    if len(rows) != 8:
-        raise ValueError("FEN board must have 8 ranks")
-
-    counts = _fresh_piece_names()
-    squares: List[Optional[str]] = []
-    for r in rows:
-        for ch in r:
-            if ch.isdigit():
-                squares.extend([None] * int(ch))
-            else:
-                squares.append(_named_piece(ch, counts))
-    if len(squares) != 64:
-        raise ValueError(f"FEN expanded to {len(squares)} squares, expected 64")
-
-    board = tuple(squares)
-    turn = _turn_from_fen(stm)
-    return EngineState(board=board, gameStates=[board], turn=turn)
-
-
-def _idx_to_uci(i: int) -> str:
-    files = "abcdefgh"
-    file = files[i % 8]
-    rank = 8 - (i // 8)
-    return f"{file}{rank}"
-
-
-def _infer_move(prev: Board, nxt: Board, turn: str) -> Optional[str]:
+def _parse_position(tokens: List[str], state: EngineState) -> EngineState:
     """
-    Infer a UCI move string (e2e4, e7e8q, e1g1, etc.) from board diffs.
+    Apply `position startpos|fen <fen> [moves ...]`. GUIs resend the whole game each
+    move; when it extends the move list `state` was built from, only the new moves
+    are played instead of replaying the game from the start.
     """
-    diffs = [i for i in range(64) if prev[i] != nxt[i]]
-    if not diffs:
-        return None
-
-    # Castling: rook+king move => 4 diffs. Encode as king move.
-    if len(diffs) >= 4:
-        if turn == "bot":  # white
-            # e1g1 or e1c1
-            if prev[60] and prev[60][0] == "K" and nxt[62] and nxt[62][0] == "K":
-                return "e1g1"
-            if prev[60] and prev[60][0] == "K" and nxt[58] and nxt[58][0] == "K":
-                return "e1c1"
-        else:  # black
-            if prev[4] and prev[4][0] == "k" and nxt[6] and nxt[6][0] == "k":
-                return "e8g8"
-            if prev[4] and prev[4][0] == "k" and nxt[2] and nxt[2][0] == "k":
-                return "e8c8"
-
-    # Normal move/promotion: usually 2 diffs; en passant: 3 diffs.
-    from_candidates = [i for i in diffs if prev[i] is not None and nxt[i] is None]
-    to_candidates = [i for i in diffs if nxt[i] is not None and (prev[i] is None or prev[i] != nxt[i])]
-    if len(from_candidates) != 1 or len(to_candidates) != 1:
-        return None
-
-    from_sq = from_candidates[0]
-    to_sq = to_candidates[0]
+    if not tokens:
+        return state
+    mi = tokens.index("moves") if "moves" in tokens else len(tokens)
+    moves = tuple(tokens[mi + 1 :])
+    if tokens[0] == "startpos":
+        origin = "startpos"
+        fen = START_FEN
+    elif tokens[0] == "fen":
+        # position fen <fen...> [moves ...]
+        fen = " ".join(tokens[1:mi])
+        origin = "fen " + fen
+    else:
+        return state
 
-    uci = f"{_idx_to_uci(from_sq)}{_idx_to_uci(to_sq)}"
+    done = len(state.moves)
+    if state.origin != origin or moves[:done] != state.moves:
+        state = board_from_fen(fen)
+        done = 0
+    for mv in moves[done:]:
+        state = _apply_uci_move(state, mv)
+    return EngineState(pos=state.pos, origin=origin, moves=moves)
 
-    moved_after = nxt[to_sq]
-    moved_before = prev[from_sq]
-    if moved_after and moved_before and moved_before[0].lower() == "p" and moved_after[0].lower() != "p":
-        # Promotion: uci wants lowercase piece letter.
-        uci += moved_after[0].lower()
-    return uci
 
+_out_lock = threading.Lock()
 
-def _apply_uci_move(state: EngineState, uci: str) -> EngineState:
-    uci = uci.strip()
-    if len(uci) < 4:
-        return state
-    frm = uci[0:2]
-    to = uci[2:4]
-    promo = uci[4:5].lower() if len(uci) >= 5 else None
 
-    from_idx = findSquare(frm)
-    to_idx = findSquare(to)
-    if from_idx is False or to_idx is False:
-        return state
+def _send(*lines: str) -> None:
+    """Write protocol lines; the search thread and the stdin loop both answer the GUI."""
+    with _out_lock:
+        for line in lines:
+            print(line)
+        sys.stdout.flush()
 
-    piece = state.board[from_idx]
-    if piece is None:
-        return state
 
-    # Castling (UCI uses king move like e1g1). The core engine doesn't model castling as a normal
-    # king move, so handle it explicitly for position syncing.
-    if piece[0] in ("K", "k") and frm in ("e1", "e8") and to in ("g1", "c1", "g8", "c8"):
-        b = list(state.board)
-        mover = state.turn
-        if mover == "bot" and frm == "e1" and piece[0] == "K":
-            if to == "g1":  # king side: rook h1 (R2) to f1
-                if b[61] is not None or b[62] is not None or b[63] != "R2":
-                    return state
-                if not isKingSafe(tuple(b), mover):
-                    return state
-                t = b[:]
-                t[60] = None
-                t[61] = "K"
-                if not isKingSafe(tuple(t), mover):
-                    return state
-                t[61] = None
-                t[62] = "K"
-                if not isKingSafe(tuple(t), mover):
-                    return state
-                b[60] = None
-                b[62] = "K"
-                b[63] = None
-                b[61] = "R2"
-            elif to == "c1":  # queen side: rook a1 (R1) to d1
-                if b[59] is not None or b[58] is not None or b[57] is not None or b[56] != "R1":
-                    return state
-                if not isKingSafe(tuple(b), mover):
-                    return state
-                t = b[:]
-                t[60] = None
-                t[59] = "K"
-                if not isKingSafe(tuple(t), mover):
-                    return state
-                t[59] = None
-                t[58] = "K"
-                if not isKingSafe(tuple(t), mover):
-                    return state
-                b[60] = None
-                b[58] = "K"
-                b[56] = None
-                b[59] = "R1"
-            else:
-                return state
-        elif mover == "player" and frm == "e8" and piece[0] == "k":
-            if to == "g8":  # king side: rook h8 (r2) to f8
-                if b[5] is not None or b[6] is not None or b[7] != "r2":
-                    return state
-                if not isKingSafe(tuple(b), mover):
-                    return state
-                t = b[:]
-                t[4] = None
-                t[5] = "k"
-                if not isKingSafe(tuple(t), mover):
-                    return state
-                t[5] = None
-                t[6] = "k"
-                if not isKingSafe(tuple(t), mover):
-                    return state
-                b[4] = None
-                b[6] = "k"
-                b[7] = None
-                b[5] = "r2"
-            elif to == "c8":  # queen side: rook a8 (r1) to d8
-                if b[3] is not None or b[2] is not None or b[1] is not None or b[0] != "r1":
-                    return state
-                if not isKingSafe(tuple(b), mover):
-                    return state
-                t = b[:]
-                t[4] = None
-                t[3] = "k"
-                if not isKingSafe(tuple(t), mover):
-                    return state
-                t[3] = None
-                t[2] = "k"
-                if not isKingSafe(tuple(t), mover):
-                    return state
-                b[4] = None
-                b[2] = "k"
-                b[0] = None
-                b[3] = "r1"
-            else:
-                return state
-        else:
-            return state
-
-        new_board = tuple(b)
-        gs = state.gameStates + [new_board]
-        gs = gs[-2:]
-        return EngineState(board=new_board, gameStates=gs, turn=_opponent(state.turn))
-
-    if not moveValidate(piece, to_idx, state.turn, state.board, BOT_WHITE, state.gameStates):
-        return state
+def _ponder_move(pos: Position, best: Move, tt: TranspositionTable) -> Optional[Move]:
+    """The reply to `best` that the TT holds, if it is legal (the `ponder` move)."""
+    after = apply(pos, best)
+    entry = tt.probe(after.hash)
+    if entry is None or entry.best is None:
+        return None
+    m = entry.best
+    return m if is_pseudo_legal(after, m) and is_legal(after, m) else None
 
-    new_board = movePiece(piece, to_idx, state.board, state.gameStates, state.turn)
-    if not isKingSafe(new_board, state.turn):
-        return state
 
-    # Promotion (engine uses promotePawn which assigns a new unique name)
-    if promo and piece[0].lower() == "p":
-        name = {"q": "QUEEN", "r": "ROOK", "b": "BISHOP", "n": "KNIGHT"}.get(promo)
-        if name:
-            new_board = promotePawn(piece, to_idx, name, new_board, state.turn)
+def _info_line(info: IterationInfo) -> str:
+    mate = mate_distance(info.score)
+    score = f"mate {(mate + 1) // 2 if mate > 0 else mate // 2}" if mate is not None else f"cp {round(info.score * 100)}"
+    ms = max(1, int(info.seconds * 1000))
+    return (
+        f"info depth {info.depth} score {score} nodes {info.nodes} nps {info.nodes * 1000 // ms} "
+        f"time {ms} hashfull {info.hashfull} pv {' '.join(move_to_uci(m) for m in info.pv)}"
+    )
 
-    gs = state.gameStates + [new_board]
-    gs = gs[-2:]
-    return EngineState(board=new_board, gameStates=gs, turn=("player" if state.turn == "bot" else "bot"))
 
+class SearchJob:
+    """
+    One `go`: searches a position on a background thread, sends an `info` line per
+    completed iteration and finally `bestmove X ponder Y`, Y being the reply the
+    transposition table expects.
+
+    The stdin loop keeps reading meanwhile, so `stop` ends the search (the flag is
+    polled by the search's node counter) and `isready` is answered at once. `go
+    infinite` and `go ponder` have no deadline and hold their bestmove until stop
+    (or ponderhit, which starts the clock on `time_limit_s`). The shared table stays
+    warm for the next search when the opponent plays something else. Fixed-depth
+    analysis (`split`) searches the root moves in helper processes; stop cancels the
+    ones not started and flags the running ones to give up.
+    """
 
-def _parse_position(tokens: List[str], state: EngineState) -> EngineState:
-    if not tokens:
-        return state
-    if tokens[0] == "startpos":
-        # Standard start FEN
-        state = board_from_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
-        tokens = tokens[1:]
-    elif tokens[0] == "fen":
-        # position fen <fen...> [moves ...]
-        if "moves" in tokens:
-            mi = tokens.index("moves")
-            fen = " ".join(tokens[1:mi])
-            rest = tokens[mi + 1 :]
+    def __init__(
+        self,
+        pos: Position,
+        depth: int,
+        time_limit_s: Optional[float],
+        tt: TranspositionTable,
+        caches: SearchCaches,
+        threads: int = 1,
+        ponder: bool = False,
+        infinite: bool = False,
+        split: bool = False,
+    ):
+        self.pos = pos
+        self.depth = depth
+        self.time_limit_s = time_limit_s
+        self.tt = tt
+        self.caches = caches
+        self.threads = threads
+        self.pondering = ponder
+        self.infinite = infinite
+        self.split = split
+        self.deadline = None if ponder or infinite or time_limit_s is None else time.perf_counter() + time_limit_s
+        self.silent = False
+        self.thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._resume = threading.Event()  # stop, or ponderhit unless infinite
+
+    def _expired(self) -> bool:
+        return self._stop.is_set() or (self.deadline is not None and time.perf_counter() >= self.deadline)
+
+    def run(self) -> None:
+        start = time.perf_counter()
+        if self.split:
+            res = split_root_search(
+                self.pos,
+                self.depth,
+                workers=self.threads,
+                tt=self.tt,
+                on_iteration=lambda info: _send(_info_line(info)),
+                abort=self._expired,
+            )
+            best = res[0] if res is not None else None
         else:
-            fen = " ".join(tokens[1:])
-            rest = []
-        state = board_from_fen(fen)
-        tokens = ["moves"] + rest if rest else []
-
-    if tokens and tokens[0] == "moves":
-        for mv in tokens[1:]:
-            state = _apply_uci_move(state, mv)
-    return state
+            best = search_position(
+                self.pos,
+                self.depth,
+                tt=self.tt,
+                caches=self.caches,
+                threads=self.threads,
+                abort=self._expired,
+                on_iteration=lambda info: _send(_info_line(info)),
+            )
+        if self.pondering or self.infinite:
+            # These may not answer before ponderhit/stop, even if they ran out of depth.
+            self._resume.wait()
+        if self.silent:
+            return
+        if best is None:
+            _send("bestmove 0000")
+            return
+        reply = _ponder_move(self.pos, best, self.tt)
+        _send(
+            f"info string time={time.perf_counter() - start:.3f}s depth={self.depth}",
+            f"bestmove {move_to_uci(best)}" + (f" ponder {move_to_uci(reply)}" if reply is not None else ""),
+        )
+
+    def start(self) -> None:
+        """Search on a background thread."""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def ponderhit(self) -> None:
+        """The opponent played the expected move: keep searching, now on our clock."""
+        if self.time_limit_s is not None:
+            self.deadline = time.perf_counter() + self.time_limit_s
+        self.pondering = False
+        if not self.infinite:
+            self._resume.set()
+
+    def stop(self, silent: bool = False) -> None:
+        """
+        End the search without waiting for it; the search thread still sends its
+        bestmove unless `silent` (only the first call decides).
+        """
+        if not self._stop.is_set():
+            self.silent = silent
+        self._stop.set()
+        self._resume.set()
+
+    def join(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for the search thread; False if it is still running."""
+        if self.thread is None:
+            return True
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
+
+
+def _parse_setoption(tokens: List[str]) -> Tuple[str, str]:
+    """`setoption name <id...> [value <x...>]` -> (lowercased id, value)."""
+    if "name" not in tokens:
+        return "", ""
+    ni = tokens.index("name")
+    vi = tokens.index("value") if "value" in tokens else len(tokens)
+    return " ".join(tokens[ni + 1 : vi]).lower(), " ".join(tokens[vi + 1 :])
 
 
 def main() -> int:
-    state = board_from_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+    state = board_from_fen(START_FEN)
+    # One table for the whole session: consecutive `go`s share most of their subtrees.
+    threads = 1
+    tt = new_transposition_table(TT_DEFAULT_MB, threads)
+    caches = SearchCaches.sized()
+    job: Optional[SearchJob] = None
 
     try:
         while True:
@@ -296,19 +279,66 @@ def main() -> int:
             cmd = parts[0]
 
             if cmd == "uci":
-                print("id name chess-python-bot")
-                print("id author local")
-                print("uciok")
-                sys.stdout.flush()
+                _send(
+                    "id name chess-python-bot",
+                    "id author local",
+                    f"option name Hash type spin default {TT_DEFAULT_MB} min 1 max 1024",
+                    f"option name Threads type spin default 1 min 1 max {MAX_THREADS}",
+                    "option name Ponder type check default false",
+                    "uciok",
+                )
                 continue
 
             if cmd == "isready":
-                print("readyok")
-                sys.stdout.flush()
+                _send("readyok")
+                continue
+
+            if cmd == "ponderhit":
+                if job is not None:
+                    job.ponderhit()
+                continue
+
+            if cmd == "stop":
+                # The search thread answers with bestmove; keep reading meanwhile.
+                if job is not None:
+                    job.stop()
+                continue
+
+            if cmd not in ("position", "go", "setoption", "ucinewgame", "quit"):
+                # debug, register, unknown tokens: nothing to do, and a running search goes on.
+                continue
+
+            if job is not None:
+                # These replace the search (the GUI should have sent stop first) and may touch
+                # the table it uses, so give it a moment to finish.
+                job.stop(silent=True)
+                if not job.join(STOP_WAIT_S):
+                    _send("info string previous search is still stopping")
+                job = None
+
+            if cmd == "setoption":
+                name, value = _parse_setoption(parts[1:])
+                if name == "hash":
+                    try:
+                        tt.resize(max(1, min(1024, int(value))))
+                    except ValueError:
+                        pass
+                elif name == "threads":
+                    try:
+                        n = max(1, min(MAX_THREADS, int(value)))
+                    except ValueError:
+                        continue
+                    if (n > 1) != (threads > 1):
+                        # Helper processes need the table in shared memory (and one process doesn't).
+                        tt = new_transposition_table(tt.size_mb, n)
+                    threads = n
                 continue
 
             if cmd == "ucinewgame":
-                state = board_from_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+                state = board_from_fen(START_FEN)
+                tt.clear()
+                caches.score.clear()
+                caches.king_safe.clear()
                 continue
 
             if cmd == "position":
@@ -316,7 +346,7 @@ def main() -> int:
                 continue
 
             if cmd == "go":
-                # Support: go depth N | go movetime MS | go wtime/btime/winc/binc/movestogo
+                # Support: go depth N | go movetime MS | go wtime/btime/winc/binc/movestogo [ponder]
                 depth = 3
                 movetime_ms: Optional[int] = None
                 wtime_ms: Optional[int] = None
@@ -364,31 +394,18 @@ def main() -> int:
                 else:
                     time_limit_s = None
 
-                start = time.perf_counter()
-                best_board = botMove(
-                    state.board,
-                    state.turn,
-                    state.gameStates,
-                    BOT_WHITE,
-                    depth=depth,
-                    time_limit_s=time_limit_s,
+                ponder = "ponder" in parts
+                infinite = "infinite" in parts
+                if ponder or infinite:
+                    # Ponder: the position already includes the move we expect; think on the opponent's time.
+                    depth = depth_v or MAX_DEPTH
+                # Fixed-depth analysis with helpers: split the root moves, so the answer doesn't depend
+                # on how many there are. Threads=1 keeps the normal search and the session table.
+                split = time_limit_s is None and depth_v is not None and threads > 1 and not (ponder or infinite)
+                job = SearchJob(
+                    state.pos, depth, time_limit_s, tt, caches, threads, ponder=ponder, infinite=infinite, split=split
                 )
-                elapsed = time.perf_counter() - start
-
-                if best_board is None:
-                    print("bestmove 0000")
-                    sys.stdout.flush()
-                    continue
-
-                uci_move = _infer_move(state.board, best_board, state.turn) or "0000"
-
-                print(f"info string time={elapsed:.3f}s depth={depth}")
-                print(f"bestmove {uci_move}")
-                sys.stdout.flush()
-                continue
-
-            if cmd == "stop":
-                # This engine is synchronous; we respect time limits via `go` parsing above.
+                job.start()
                 continue
 
             if cmd == "quit":